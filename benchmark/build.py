@@ -0,0 +1,192 @@
+""" Benchmark a full Sphinx build of a synthetic C# corpus
+
+Generates a corpus with benchmark/corpus.py and builds it in this process,
+reporting as JSON the time taken by each phase of the build, the peak
+memory of the process and the size of the pickled environment and
+doctrees. The phases are:
+
+  init        creating the Sphinx application
+  read        reading all documents, up to env-updated
+  directives  running the C# directives (part of read)
+  parse       parsing signatures (part of directives)
+  write       resolving and writing all documents, up to build-finished
+  resolve     resolving C# cross-references (part of write)
+  total       the whole build
+
+The directive, parse and resolve times are only measured in this process,
+so are not complete for parallel builds.
+
+Usage: python benchmark/build.py [options] [--compare previous.json]
+"""
+
+from __future__ import print_function
+
+import argparse
+import functools
+import io
+import json
+import os
+import resource
+import shutil
+import sys
+import tempfile
+from timeit import default_timer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# pylint: disable=wrong-import-position
+from sphinx.application import Sphinx  # noqa: E402
+from corpus import DEFAULTS, Corpus, add_arguments  # noqa: E402
+from sphinx_csharp import csharp  # noqa: E402
+
+PHASES = ['init', 'read', 'directives', 'parse', 'write', 'resolve', 'total']
+
+
+class PhaseTimer(object):
+    """ Records the time taken by the phases of a build """
+
+    def __init__(self):
+        self.times = dict((phase, 0.0) for phase in PHASES)
+        self.starts = {}
+
+    def start(self, phase):
+        self.starts[phase] = default_timer()
+
+    def stop(self, phase):
+        self.times[phase] += default_timer() - self.starts.pop(phase)
+
+    def wrap(self, owner, attr, phase):
+        """ Add the time spent in a function or method to a phase. Nested
+            calls, e.g. of directives within directives, are only counted
+            once. """
+        func = getattr(owner, attr)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if phase in self.starts:
+                return func(*args, **kwargs)
+            self.start(phase)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.stop(phase)
+        setattr(owner, attr, wrapper)
+
+    def connect(self, app):
+        """ Time the read and write phases using Sphinx events """
+        app.connect('env-before-read-docs',
+                    lambda *_: self.start('read'))
+        app.connect('env-updated', lambda *_: self.stop('read'))
+        app.connect('env-updated', lambda *_: self.start('write'))
+        app.connect('build-finished', lambda *_: self.stop('write'))
+
+
+def instrument(timer):
+    """ Time the C# domain's directives, signature parsing and resolving """
+    for name in dir(csharp):
+        if name.startswith('parse_') and name.endswith('_signature'):
+            timer.wrap(csharp, name, 'parse')
+    timer.wrap(csharp.CSharpObject, 'run', 'directives')
+    timer.wrap(csharp.CSharpDomain, 'resolve_xref', 'resolve')
+    timer.wrap(csharp.CSharpDomain, 'resolve_any_xref', 'resolve')
+    timer.wrap(csharp.ResolveReferences, 'apply', 'resolve')
+
+
+def peak_memory():
+    """ Peak resident memory of this process, in megabytes """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        return peak / (1024.0 * 1024.0)
+    return peak / 1024.0
+
+
+def build(srcdir, outdir, jobs, overrides=None):
+    """ Build the corpus, returning the results """
+    timer = PhaseTimer()
+    instrument(timer)
+    doctreedir = os.path.join(outdir, '.doctrees')
+    warnings = io.StringIO()
+    timer.start('total')
+    timer.start('init')
+    app = Sphinx(srcdir, srcdir, outdir, doctreedir, 'html',
+                 confoverrides=overrides, status=None, warning=warnings,
+                 freshenv=True, parallel=jobs)
+    timer.stop('init')
+    timer.connect(app)
+    app.build()
+    timer.stop('total')
+    return {
+        'phases': dict((phase, round(timer.times[phase], 4))
+                       for phase in PHASES),
+        'peak_memory_mb': round(peak_memory(), 1),
+        'environment_pickle_bytes': os.path.getsize(
+            os.path.join(doctreedir, 'environment.pickle')),
+        'doctree_bytes': sum(
+            os.path.getsize(os.path.join(doctreedir, name))
+            for name in os.listdir(doctreedir) if name.endswith('.doctree')),
+        'documents': len(app.env.found_docs),
+        'objects': len(list(app.env.get_domain('csharp').get_objects())),
+        'warnings': len(warnings.getvalue().splitlines()),
+        'stats': csharp.STATS.snapshot(),
+    }
+
+
+def compare(results, previous):
+    """ Print the change in each measurement from previous results """
+    rows = [('phases.' + phase, previous['phases'].get(phase),
+             results['phases'][phase]) for phase in PHASES]
+    rows += [(key, previous.get(key), results[key])
+             for key in ('peak_memory_mb', 'environment_pickle_bytes',
+                         'doctree_bytes')]
+    print('%-32s %14s %14s %8s' % ('measurement', 'previous', 'current',
+                                   'ratio'), file=sys.stderr)
+    for name, old, new in rows:
+        ratio = '%.2f' % (new / old) if old else '-'
+        print('%-32s %14s %14s %8s' % (name, old, new, ratio),
+              file=sys.stderr)
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_arguments(argparser)
+    argparser.add_argument('--jobs', type=int, default=1)
+    argparser.add_argument('-D', action='append', default=[],
+                           dest='overrides', metavar='setting=value',
+                           help='override a setting in conf.py')
+    argparser.add_argument('--output', help='write the results to a file')
+    argparser.add_argument('--compare', help='previous results to compare to')
+    argparser.add_argument('--keep', help='build in the given directory, '
+                           'and keep the corpus and output')
+    args = argparser.parse_args()
+
+    config = dict((name, getattr(args, name)) for name in DEFAULTS)
+    workdir = args.keep or tempfile.mkdtemp()
+    try:
+        srcdir = os.path.join(workdir, 'src')
+        outdir = os.path.join(workdir, 'out')
+        if os.path.exists(outdir):
+            shutil.rmtree(outdir)
+        Corpus(**config).write(srcdir)
+        overrides = dict(override.split('=', 1)
+                         for override in args.overrides)
+        results = build(srcdir, outdir, args.jobs, overrides)
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir)
+    results['config'] = dict(config, jobs=args.jobs,
+                             overrides=args.overrides)
+
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(output + '\n')
+    else:
+        print(output)
+    if args.compare:
+        with open(args.compare) as previous_file:
+            compare(results, json.load(previous_file))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
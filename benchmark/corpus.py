@@ -0,0 +1,156 @@
+""" Generate synthetic C# API documentation for benchmarking
+
+Writes a Sphinx project with one page per namespace, each holding classes
+with methods (and their overloads), properties, indexers and an enum, with
+parameter types nested to the given generic depth and the given number of
+cross-references per member.
+
+Usage: python benchmark/corpus.py output-directory [options]
+"""
+
+import argparse
+import os
+import random
+import sys
+
+CONF = '''project = 'Benchmark'
+master_doc = 'index'
+extensions = ['sphinx_csharp.csharp']
+'''
+
+#: The default size of the corpus
+DEFAULTS = {
+    'namespaces': 20,
+    'classes': 10,
+    'methods': 10,
+    'overloads': 2,
+    'generic_depth': 2,
+    'xref_density': 2,
+    'seed': 0,
+}
+
+TYPES = ['int', 'string', 'bool', 'double', 'System.Guid']
+
+
+def add_arguments(argparser):
+    """ Add the options controlling the size of the corpus """
+    for name, default in sorted(DEFAULTS.items()):
+        argparser.add_argument('--' + name.replace('_', '-'), type=int,
+                               default=default, dest=name)
+
+
+class Corpus(object):
+    """ Generator for a synthetic documentation tree """
+
+    def __init__(self, namespaces, classes, methods, overloads,
+                 generic_depth, xref_density, seed=0):
+        self.namespaces = namespaces
+        self.classes = classes
+        self.methods = methods
+        self.overloads = overloads
+        self.generic_depth = generic_depth
+        self.xref_density = xref_density
+        self.rng = random.Random(seed)
+
+    def namespace(self, i):
+        return 'Company.Product%d.Area%d' % (i % 3, i)
+
+    def random_class(self):
+        """ The full name of a random class in the corpus """
+        return '%s.Class%d' % (
+            self.namespace(self.rng.randrange(self.namespaces)),
+            self.rng.randrange(self.classes))
+
+    def random_type(self, depth):
+        """ A parameter type, with generic arguments nested depth deep """
+        if depth == 0:
+            return self.rng.choice(TYPES + [self.random_class()])
+        if self.rng.random() < 0.5:
+            return 'IList<%s>' % self.random_type(depth - 1)
+        return 'IDictionary<%s, %s>' % (
+            self.rng.choice(TYPES), self.random_type(depth - 1))
+
+    def references(self, namespace, cls):
+        """ Cross-references made by the description of a member """
+        refs = []
+        for _ in range(self.xref_density):
+            kind = self.rng.randrange(4)
+            if kind == 0:
+                refs.append(':meth:`Method%d`' %
+                            self.rng.randrange(self.methods))
+            elif kind == 1:
+                refs.append(':prop:`%s.Property`' % cls)
+            elif kind == 2:
+                refs.append(':type:`%s`' % self.random_class())
+            else:
+                refs.append(':enum:`%s.Kind.Value%d`' %
+                            (namespace, self.rng.randrange(4)))
+        return refs
+
+    def member_lines(self, namespace, cls, directive, sig):
+        lines = ['   .. %s:: %s' % (directive, sig), '']
+        refs = self.references(namespace, cls)
+        if refs:
+            lines.extend(['      See ' + ', '.join(refs) + '.', ''])
+        return lines
+
+    def page(self, index):
+        """ The lines of the page documenting a namespace """
+        namespace = self.namespace(index)
+        lines = [namespace, '=' * len(namespace), '',
+                 '.. default-domain:: csharp', '',
+                 '.. namespace:: ' + namespace, '',
+                 '.. enum:: Kind', '']
+        for value in range(4):
+            lines.extend(['   .. value:: Value%d' % value, ''])
+        for i in range(self.classes):
+            cls = 'Class%d' % i
+            lines.extend(['.. class:: ' + cls, ''])
+            lines.extend(self.member_lines(
+                namespace, cls, 'method', '%s (int capacity)' % cls))
+            for j in range(self.methods):
+                for k in range(self.overloads):
+                    params = ', '.join(
+                        '%s arg%d' % (self.random_type(self.generic_depth), n)
+                        for n in range(k + 1))
+                    lines.extend(self.member_lines(
+                        namespace, cls, 'method',
+                        '%s Method%d (%s)' % (
+                            self.random_type(self.generic_depth), j, params)))
+            lines.extend(self.member_lines(
+                namespace, cls, 'property',
+                'public %s Property { get; set; }' %
+                self.random_type(self.generic_depth)))
+            lines.extend(self.member_lines(
+                namespace, cls, 'indexer',
+                'string this[int index] { get; }'))
+        return lines
+
+    def write(self, path):
+        """ Write the Sphinx project to the given directory """
+        if not os.path.exists(path):
+            os.makedirs(path)
+        with open(os.path.join(path, 'conf.py'), 'w') as output:
+            output.write(CONF)
+        pages = ['ns%d' % i for i in range(self.namespaces)]
+        with open(os.path.join(path, 'index.rst'), 'w') as output:
+            output.write('Benchmark\n=========\n\n.. toctree::\n\n')
+            for page in pages:
+                output.write('   %s\n' % page)
+        for i, page in enumerate(pages):
+            with open(os.path.join(path, page + '.rst'), 'w') as output:
+                output.write('\n'.join(self.page(i)) + '\n')
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    argparser.add_argument('output')
+    add_arguments(argparser)
+    args = vars(argparser.parse_args())
+    Corpus(**dict((name, args[name]) for name in DEFAULTS)).write(
+        args['output'])
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,178 @@
+""" Benchmark looking up cross-reference targets in the C# domain
+
+Compares CSharpDomain.find_object, which uses the short name index, with
+the previous lookup that probed the objects dict with every combination of
+object type and scope qualified target.
+
+Then puts the same objects in an intersphinx inventory, and compares
+looking up the references in an InventoryIndex, by scope and then by
+unambiguous suffix, with scanning the inventory for names ending with the
+target.
+
+Usage: python benchmark/resolve.py [number of references]
+"""
+
+# pylint: disable=protected-access
+
+import copy
+import os
+import random
+import sys
+from timeit import default_timer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# pylint: disable=wrong-import-position
+from sphinx_csharp.csharp import CSharpDomain  # noqa: E402
+from sphinx_csharp.inventory import InventoryIndex  # noqa: E402
+from sphinx_csharp.references import scope_targets  # noqa: E402
+from sphinx_csharp.store import TrieStore  # noqa: E402
+
+OBJTYPES = ['class', 'method', 'property', 'enum', 'value', 'attribute',
+            'indexer']
+
+
+def make_domain(namespaces=200, classes=20, members=20):
+    """ Create a domain holding namespaces*classes*members objects, in
+        namespaces nested four deep """
+    domain = CSharpDomain.__new__(CSharpDomain)
+    domain.data = copy.deepcopy(CSharpDomain.initial_data)
+    domain._store = TrieStore(domain.data)
+    domain._xref_targets = {}
+    domain._old_locations = {}
+    scopes = []
+    for i in range(namespaces):
+        namespace = 'Company.Product%d.Area%d.Feature%d' % (i % 3, i % 17, i)
+        for j in range(classes):
+            cls = '%s.Class%d' % (namespace, j)
+            domain._add_object(('class', cls, ''), 'doc%d' % i)
+            for k in range(members):
+                objtype = 'method' if k % 2 else 'property'
+                domain._add_object(
+                    (objtype, '%s.Member%d' % (cls, k), ''), 'doc%d' % i)
+            scopes.append(cls)
+    return domain, scopes
+
+
+def old_find_object(objects, objtypes, target, scope):
+    """ The lookup used before the short name index was added """
+    targets = [target]
+    if scope is not None:
+        parts = scope.split('.')
+        while parts:
+            targets.append('.'.join(parts)+'.'+target)
+            parts = parts[:-1]
+    for tgt in targets:
+        for objtype in objtypes:
+            if (objtype, tgt) in objects:
+                return (objtype, tgt)
+    return None
+
+
+def make_references(scopes, count):
+    rng = random.Random(0)
+    refs = []
+    for _ in range(count):
+        scope = rng.choice(scopes)
+        kind = rng.randint(0, 3)
+        if kind == 0:
+            target = 'Member%d' % rng.randint(0, 25)
+        elif kind == 1:
+            target = 'Class%d' % rng.randint(0, 25)
+        elif kind == 2:
+            target = 'Class%d.Member%d' % (
+                rng.randint(0, 25), rng.randint(0, 25))
+        else:
+            target = rng.choice(scopes) + '.Member1'
+        refs.append((OBJTYPES, target, scope))
+    return refs
+
+
+def make_inventory(objects):
+    """ An intersphinx inventory holding the given objects """
+    inventory = {}
+    for objtype, fullname in objects:
+        inventory.setdefault('csharp:' + objtype, {})[fullname] = (
+            'Other', '1.0', 'https://example.com/' + fullname, '-')
+    return inventory
+
+
+def index_find(index, objtypes, target, scope):
+    found = index.find(objtypes, scope_targets(target, scope))
+    if found is None:
+        found = index.find_suffix(objtypes, target)
+    return None if found is None else found[0]
+
+
+def scan_find(inventory, objtypes, target, scope):
+    """ Look up a reference without an index, as the generic fallback
+        would, by trying each scope and then scanning for the suffix """
+    for tgt in scope_targets(target, scope):
+        for objtype in objtypes:
+            if tgt in inventory.get('csharp:' + objtype, {}):
+                return tgt
+    found = set()
+    for objtype in objtypes:
+        for name in inventory.get('csharp:' + objtype, {}):
+            if name.endswith('.' + target):
+                found.add(name)
+    return found.pop() if len(found) == 1 else None
+
+
+def benchmark_inventory(objects, refs):
+    """ Compare resolving references against an inventory with and without
+        an index """
+    inventory = make_inventory(objects)
+    start = default_timer()
+    index = InventoryIndex(inventory)
+    index_time = default_timer() - start
+    scanned = refs[:max(1, len(refs) // 1000)]
+
+    start = default_timer()
+    old = [scan_find(inventory, *ref) for ref in scanned]
+    old_time = default_timer() - start
+
+    start = default_timer()
+    new = [index_find(index, *ref) for ref in refs]
+    new_time = default_timer() - start
+
+    if old != new[:len(scanned)]:
+        print('inventory lookups differ')
+        return 1
+    print('inventory index built in %.3f s' % index_time)
+    print('inventory scan: %.3f s (%.2f us per reference, %d references)' %
+          (old_time, old_time * 1e6 / len(scanned), len(scanned)))
+    print('inventory index: %.3f s (%.2f us per reference, %d resolved)' %
+          (new_time, new_time * 1e6 / len(refs),
+           sum(1 for x in new if x is not None)))
+    return 0
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    domain, scopes = make_domain()
+    refs = make_references(scopes, count)
+    objects = domain.store.objects
+
+    start = default_timer()
+    old = [old_find_object(objects, *ref) for ref in refs]
+    old_time = default_timer() - start
+
+    start = default_timer()
+    new = [domain.find_object(*ref) for ref in refs]
+    new_time = default_timer() - start
+
+    if old != new:
+        print('lookups differ')
+        return 1
+    print('%d objects, %d references (%d resolved)' %
+          (len(objects), count, sum(1 for x in new if x is not None)))
+    print('old lookup: %.3f s (%.2f us per reference)' %
+          (old_time, old_time * 1e6 / count))
+    print('new lookup: %.3f s (%.2f us per reference)' %
+          (new_time, new_time * 1e6 / count))
+    return benchmark_inventory(objects, refs)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,84 @@
+""" Benchmark the signature parser on pathological input
+
+Compares sphinx_csharp.parser against the regular expressions it replaced,
+on signatures that made those regular expressions backtrack. Fails if the
+parser's run time grows faster than linearly with the signature length.
+
+Usage: python benchmark/signatures.py
+"""
+
+import os
+import re
+import sys
+from timeit import default_timer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sphinx_csharp import parser  # noqa: E402 pylint: disable=wrong-import-position
+
+OLD_MODIFIERS_RE = '|'.join(['public', 'private', 'internal', 'protected',
+                             'abstract', 'async', 'const', 'event',
+                             'extern', 'new', 'override', 'partial',
+                             'readonly', 'sealed', 'static', 'unsafe',
+                             'virtual', 'volatile'])
+OLD_METH_SIG_RE = re.compile(
+    r'^((?:(?:' + OLD_MODIFIERS_RE +
+    r')\s+)*)([^\s]+\s+)*([^\s<]+)\s*(<[^\(]+>)?\s*\((.*)\)$')
+OLD_PROP_SIG_RE = re.compile(
+    r'^([^\s]+\s+)*([^\s]+)\s+([^\s]+)\s*\{\s*(get;)?\s*(set;)?\s*\}$')
+
+SIZES = [250, 500, 1000, 2000, 4000]
+
+CASES = [
+    ('repeated modifiers', OLD_METH_SIG_RE, parser.parse_method,
+     lambda n: 'static ' * n + 'x'),
+    ('missing closing paren', OLD_METH_SIG_RE, parser.parse_method,
+     lambda n: 'void F(' + ', '.join(
+         'Func<int, IList<T>> arg%d' % i for i in range(n // 4))),
+    ('many generic arguments', OLD_METH_SIG_RE, parser.parse_method,
+     lambda n: 'Dictionary<' + ', '.join(['int'] * n) + '> F()'),
+    ('property without accessors', OLD_PROP_SIG_RE, parser.parse_property,
+     lambda n: 'a ' * n + '{ get; x }'),
+    ('trailing whitespace', OLD_METH_SIG_RE, parser.parse_method,
+     lambda n: 'void F()' + ' ' * n),
+]
+
+
+def measure(func, sig, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = default_timer()
+        try:
+            func(sig)
+        except RuntimeError:
+            pass
+        elapsed = default_timer() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    linear = True
+    print('%-28s %6s %8s %12s %12s' %
+          ('case', 'size', 'chars', 'regex (ms)', 'parser (ms)'))
+    for name, regex, func, make_sig in CASES:
+        times = []
+        for size in SIZES:
+            sig = make_sig(size)
+            old = measure(regex.match, sig, repeat=1)
+            new = measure(func, sig)
+            times.append(new)
+            print('%-28s %6d %8d %12.2f %12.2f' %
+                  (name, size, len(sig), old * 1000, new * 1000))
+        # Doubling the input must not much more than double the run time
+        growth = times[-1] / times[0]
+        limit = 2 * SIZES[-1] / SIZES[0]
+        if growth > limit:
+            print('%s: parser run time grew %.1fx for %dx more input' %
+                  (name, growth, SIZES[-1] // SIZES[0]))
+            linear = False
+    return 0 if linear else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,147 @@
+""" Benchmark the stores of C# domain objects
+
+Fills each store in sphinx_csharp.store with synthetic objects, in a
+separate process per store and size so that peak memory is measured on its
+own, and reports the time taken to add the objects, look up names relative
+to a scope, clear a document and iterate over all names (as get_objects
+does), along with the peak memory of the process and the size of the data
+written to disk.
+
+Usage: python benchmark/store.py [number of objects...]
+"""
+
+from __future__ import print_function
+
+import json
+import os
+import pickle
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+from timeit import default_timer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sphinx_csharp.store import STORES  # noqa: E402 pylint: disable=wrong-import-position
+
+CLASSES_PER_DOC = 10
+MEMBERS_PER_CLASS = 20
+LOOKUPS = 20000
+
+
+def class_name(index):
+    return 'Company.Product%d.Area%d.Feature%d.Class%d' % (
+        index % 3, index % 17, index // CLASSES_PER_DOC, index)
+
+
+def iter_objects(count):
+    """ Generate the key, docname and whether hidden of count objects """
+    for index in range(count // MEMBERS_PER_CLASS):
+        cls = class_name(index)
+        docname = 'doc%d' % (index // CLASSES_PER_DOC)
+        yield ('class', cls, ''), docname, False
+        for member in range(1, MEMBERS_PER_CLASS):
+            if member % 4:
+                key = ('method', '%s.Method%d' % (cls, member // 4),
+                       '%08x' % member)
+            else:
+                key = ('property', '%s.Property%d' % (cls, member), '')
+            yield key, docname, member % 5 == 0
+
+
+def time_lookups(store, classes):
+    """ Look up random names from within random classes, returning the
+        time taken and the number of names found """
+    rng = random.Random(0)
+    lookups = []
+    for _ in range(LOOKUPS):
+        scope = class_name(rng.randrange(classes))
+        target = rng.choice(['Method%d' % rng.randrange(5),
+                             'Class%d' % rng.randrange(classes),
+                             'Feature%d.Class%d' % (rng.randrange(10),
+                                                    rng.randrange(classes))])
+        lookups.append((target, scope))
+    start = default_timer()
+    found = 0
+    for target, scope in lookups:
+        for _ in store.find_names(target, scope):
+            found += 1
+            break
+    return default_timer() - start, found
+
+
+def run(backend, count, path):
+    """ Fill a store and time operations on it, returning the results """
+    data = {}
+    store = STORES[backend](data, path)
+    results = {}
+
+    start = default_timer()
+    for key, docname, hidden in iter_objects(count):
+        store.add(key, docname, hidden)
+    store.commit()
+    results['add'] = default_timer() - start
+
+    results['lookup'], results['found'] = time_lookups(
+        store, count // MEMBERS_PER_CLASS)
+
+    start = default_timer()
+    for doc in range(0, count // MEMBERS_PER_CLASS // CLASSES_PER_DOC, 10):
+        for key in store.get_doc_keys('doc%d' % doc):
+            store.remove(key)
+    store.commit()
+    results['clear'] = default_timer() - start
+
+    start = default_timer()
+    results['names'] = sum(1 for _ in store.iter_names())
+    results['iterate'] = default_timer() - start
+
+    results['peak'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if os.path.exists(path):
+        results['disk'] = sum(os.path.getsize(path + suffix)
+                              for suffix in ('', '-wal')
+                              if os.path.exists(path + suffix))
+    else:
+        results['disk'] = len(pickle.dumps(data, pickle.HIGHEST_PROTOCOL))
+    return results
+
+
+def measure(backend, count, path):
+    """ Run a benchmark in a new process """
+    output = subprocess.check_output(
+        [sys.executable, __file__, '--run', backend, str(count), path])
+    return json.loads(output.decode('utf-8'))
+
+
+def main():
+    if len(sys.argv) > 4 and sys.argv[1] == '--run':
+        print(json.dumps(run(sys.argv[2], int(sys.argv[3]), sys.argv[4])))
+        return 0
+
+    counts = [int(arg) for arg in sys.argv[1:]] or [100000, 2000000]
+    tmpdir = tempfile.mkdtemp()
+    try:
+        print('%8s %9s %8s %11s %9s %9s %8s %10s %10s' %
+              ('store', 'objects', 'add (s)', 'lookup (us)', 'clear (s)',
+               'iter (s)', 'names', 'peak (MB)', 'disk (MB)'))
+        for count in counts:
+            for backend in sorted(STORES):
+                path = os.path.join(tmpdir, '%s%d.sqlite' % (backend, count))
+                results = measure(backend, count, path)
+                print('%8s %9d %8.2f %11.2f %9.2f %9.2f %8d %10.1f %10.1f' %
+                      (backend, count, results['add'],
+                       results['lookup'] * 1e6 / LOOKUPS, results['clear'],
+                       results['iterate'], results['names'],
+                       results['peak'] / 1024.0, results['disk'] / 1e6))
+                for name in os.listdir(tmpdir):
+                    os.remove(os.path.join(tmpdir, name))
+    finally:
+        shutil.rmtree(tmpdir)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
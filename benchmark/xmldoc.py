@@ -0,0 +1,123 @@
+""" Benchmark reading C# compiler XML documentation files
+
+Generates synthetic XML documentation files and converts them to
+reStructuredText with sphinx_csharp.xmldoc, measuring the run time and peak
+memory of each conversion in a separate process. Fails if the peak memory
+grows with the size of the file, as the file should be streamed.
+
+Usage: python benchmark/xmldoc.py [number of members]
+"""
+
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+from timeit import default_timer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sphinx_csharp import xmldoc  # noqa: E402 pylint: disable=wrong-import-position
+
+MEMBERS_PER_TYPE = 20
+
+#: Allowed growth in peak memory, in kilobytes, between the smallest and
+#: largest files
+MEMORY_SLACK = 16 * 1024
+
+
+def generate(path, members):
+    """ Write an XML documentation file with the given number of members """
+    with open(path, 'w') as output:
+        output.write('<?xml version="1.0"?>\n<doc>\n  <assembly>'
+                     '<name>Benchmark</name></assembly>\n  <members>\n')
+        for i in range(members):
+            ns = 'Company.Product%d.Area%d' % (i % 7, i % 101)
+            cls = '%s.Class%d' % (ns, i // MEMBERS_PER_TYPE)
+            kind = i % MEMBERS_PER_TYPE
+            if kind == 0:
+                output.write(
+                    '    <member name="T:%s`1">\n'
+                    '      <summary>A class, see <see cref="T:%s`1"/>.'
+                    '</summary>\n'
+                    '      <typeparam name="TValue">The value type.'
+                    '</typeparam>\n    </member>\n' % (cls, cls))
+            elif kind % 3 == 0:
+                output.write(
+                    '    <member name="P:%s`1.Property%d">\n'
+                    '      <summary>A property.</summary>\n'
+                    '      <value>The value.</value>\n'
+                    '    </member>\n' % (cls, kind))
+            else:
+                output.write(
+                    '    <member name="M:%s`1.Method%d(System.Int32,'
+                    'System.Collections.Generic.IList{`0},System.String@)">\n'
+                    '      <summary>\n      A method taking '
+                    '<paramref name="count"/> items.\n'
+                    '      <para>Returns <c>true</c> on success.</para>\n'
+                    '      </summary>\n'
+                    '      <param name="count">The count.</param>\n'
+                    '      <param name="items">The items.</param>\n'
+                    '      <param name="name">The name.</param>\n'
+                    '      <returns>A result.</returns>\n'
+                    '    </member>\n' % (cls, kind))
+        output.write('  </members>\n</doc>\n')
+
+
+def convert(path):
+    """ Convert a file to reStructuredText, returning the number of lines,
+        the run time and the peak memory of this process in kilobytes """
+    aliases = {'System.Int32': 'int', 'System.String': 'string'}
+    start = default_timer()
+    lines = 0
+    for group in xmldoc.iter_rst(path, aliases=aliases):
+        lines += len(group)
+    elapsed = default_timer() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return lines, elapsed, peak
+
+
+def measure(path):
+    """ Convert a file in a new process, so its peak memory is measured
+        on its own """
+    output = subprocess.check_output(
+        [sys.executable, __file__, '--convert', path])
+    lines, elapsed, peak = output.split()
+    return int(lines), float(elapsed), int(peak)
+
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == '--convert':
+        print('%d %f %d' % convert(sys.argv[2]))
+        return 0
+
+    members = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    sizes = [members // 100, members // 10, members]
+    tmpdir = tempfile.mkdtemp()
+    try:
+        print('%10s %10s %12s %10s %14s %12s' %
+              ('members', 'file (MB)', 'rst lines', 'time (s)',
+               'members/s', 'peak (MB)'))
+        peaks = []
+        for size in sizes:
+            path = os.path.join(tmpdir, 'doc%d.xml' % size)
+            generate(path, size)
+            file_size = os.path.getsize(path)
+            lines, elapsed, peak = measure(path)
+            os.remove(path)
+            peaks.append(peak)
+            print('%10d %10.1f %12d %10.2f %14.0f %12.1f' %
+                  (size, file_size / 1e6, lines, elapsed, size / elapsed,
+                   peak / 1024.0))
+    finally:
+        shutil.rmtree(tmpdir)
+    if peaks[-1] - peaks[0] > MEMORY_SLACK:
+        print('peak memory grew by %.1f MB for %dx more members' %
+              ((peaks[-1] - peaks[0]) / 1024.0, sizes[-1] // sizes[0]))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,134 @@
+""" Benchmark resolving a page dense with C# cross-references
+
+Builds a project with a page holding thousands of references made from
+within one class, to the members of another class and to .NET types, and
+then times resolving that page's doctree again, reporting the references
+resolved per second, both for the whole of get_and_resolve_doctree and for
+the post transforms resolving references alone. If the domain resolves
+references in bulk, this is compared with Sphinx resolving them one at a
+time.
+
+Usage: python benchmark/xrefs.py [number of references]
+"""
+
+from __future__ import print_function
+
+import io
+import os
+import random
+import shutil
+import sys
+import tempfile
+from timeit import default_timer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# pylint: disable=wrong-import-position
+from sphinx.application import Sphinx  # noqa: E402
+from sphinx.transforms import post_transforms  # noqa: E402
+from corpus import CONF  # noqa: E402
+from sphinx_csharp import csharp  # noqa: E402
+
+MEMBERS = 50
+REPEATS = 5
+
+
+def write_project(path, count):
+    """ Write a project whose refs page makes count references """
+    rng = random.Random(0)
+    lines = ['References', '==========', '',
+             '.. default-domain:: csharp', '',
+             '.. namespace:: Company.Product', '',
+             '.. class:: Target', '']
+    for i in range(MEMBERS):
+        lines.extend(['   .. method:: void Method%d (int arg)' % i, '',
+                      '   .. property:: int Property%d { get; }' % i, ''])
+    lines.extend(['.. class:: Referrer', ''])
+    refs = []
+    for _ in range(count):
+        kind = rng.randrange(4)
+        if kind == 0:
+            refs.append(':meth:`Target.Method%d`' % rng.randrange(MEMBERS))
+        elif kind == 1:
+            refs.append(':prop:`Target.Property%d`' %
+                        rng.randrange(MEMBERS))
+        elif kind == 2:
+            refs.append(':type:`Target`')
+        else:
+            refs.append(':type:`%s`' % rng.choice(
+                ['System.String', 'System.Int32', 'System.Guid']))
+    for i in range(0, count, 10):
+        lines.extend(['   ' + ', '.join(refs[i:i+10]), ''])
+    os.makedirs(path)
+    with open(os.path.join(path, 'conf.py'), 'w') as output:
+        output.write(CONF)
+    with open(os.path.join(path, 'index.rst'), 'w') as output:
+        output.write('Benchmark\n=========\n\n.. toctree::\n\n   refs\n')
+    with open(os.path.join(path, 'refs.rst'), 'w') as output:
+        output.write('\n'.join(lines) + '\n')
+
+
+def time_transforms(classes, elapsed):
+    """ Add the time spent in the apply method of the given post transforms
+        to elapsed[0] """
+    for cls in classes:
+        apply = cls.apply
+
+        def wrapper(self, apply=apply, **kwargs):
+            start = default_timer()
+            try:
+                return apply(self, **kwargs)
+            finally:
+                elapsed[0] += default_timer() - start
+        cls.apply = wrapper
+
+
+def time_resolve(app, resolving):
+    """ The time taken to resolve the refs page, and the time spent
+        resolving references within that, at best """
+    times = []
+    for _ in range(REPEATS):
+        resolving[0] = 0
+        start = default_timer()
+        app.env.get_and_resolve_doctree('refs', app.builder)
+        times.append((default_timer() - start, resolving[0]))
+    return min(page for page, _ in times), min(refs for _, refs in times)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    workdir = tempfile.mkdtemp()
+    try:
+        srcdir = os.path.join(workdir, 'src')
+        write_project(srcdir, count)
+        outdir = os.path.join(workdir, 'out')
+        app = Sphinx(srcdir, srcdir, outdir, os.path.join(outdir, '.doctrees'),
+                     'html', status=None, warning=io.StringIO(),
+                     freshenv=True)
+        app.build()
+        resolving = [0]
+        transforms = [post_transforms.ReferencesResolver]
+        batch = getattr(csharp, 'ResolveReferences', None)
+        if batch is not None:
+            transforms.append(batch)
+        time_transforms(transforms, resolving)
+        results = [('resolve', time_resolve(app, resolving))]
+        registered = app.registry.get_post_transforms()
+        if batch in registered:
+            registered.remove(batch)
+            results.insert(0, ('one at a time',
+                               time_resolve(app, resolving)))
+            results[1] = ('in bulk', results[1][1])
+    finally:
+        shutil.rmtree(workdir)
+    print('%d references on one page' % count)
+    print('%-14s %10s %12s %13s %12s' % ('', 'page (ms)', 'page (refs/s)',
+                                         'resolve (ms)', 'refs/s'))
+    for name, (page, refs) in results:
+        print('%-14s %10.1f %12.0f %13.1f %12.0f' %
+              (name, page * 1e3, count / page, refs * 1e3, count / refs))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -6,10 +6,14 @@ setup(
     author = 'djungelorm',
     author_email = 'djungelorm@users.noreply.github.com',
     packages = ['sphinx_csharp'],
+    package_data = {'sphinx_csharp': ['dotnet.idx', 'static/*.js']},
     url = 'https://github.com/djungelorm/sphinx-csharp',
     license = 'MIT',
     description = 'C# domain for Sphinx',
     install_requires = ['Sphinx>=1.6'],
+    entry_points = {
+        'console_scripts': ['sphinx-csharp-lint = sphinx_csharp.lint:main'],
+    },
     classifiers=[
         'Development Status :: 4 - Beta',
         'Intended Audience :: Developers',
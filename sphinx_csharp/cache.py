@@ -0,0 +1,179 @@
+""" Caches used by the C# domain """
+
+import hashlib
+import io
+import json
+import os
+import tempfile
+import time
+from collections import OrderedDict
+
+#: Prefix of the temporary files written by DiskCache
+TMP_PREFIX = '.tmp'
+
+#: Age in seconds after which temporary files are assumed to be left over
+#: from an interrupted write
+STALE_TMP_AGE = 3600
+
+#: Replace a file atomically, os.rename does not replace files on Windows
+replace_file = getattr(os, 'replace', os.rename)
+
+
+class LRUCache(object):
+    """ A mapping holding at most maxsize entries, that discards the least
+        recently used entry when full. A maxsize of 0 disables the cache. """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key, default=None):
+        """ Get an entry, marking it as the most recently used """
+        try:
+            value = self.entries.pop(key)
+        except KeyError:
+            return default
+        self.entries[key] = value
+        return value
+
+    def put(self, key, value):
+        """ Add an entry, discarding the least recently used if full """
+        if self.maxsize <= 0:
+            return
+        self.entries.pop(key, None)
+        self.entries[key] = value
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def resize(self, maxsize):
+        """ Change the maximum size, discarding entries if necessary """
+        self.maxsize = maxsize
+        while len(self.entries) > max(maxsize, 0):
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+
+class DiskCache(object):
+    """ A cache of values stored in a directory, that can be shared by
+        parallel workers and between builds. Entries are stored as JSON,
+        rather than pickled, so that anyone who can write to a shared cache
+        cannot run code in the builds reading it. Values are converted to
+        and from JSON compatible values by the encode and decode functions.
+        Entries are stored in a file named by a hash of the key and a
+        version number, so changing the version invalidates all existing
+        entries.
+
+        Files are written to a temporary file and renamed into place, so
+        readers never see a partial entry and no locking is needed. Entries
+        that cannot be read are treated as missing. The cache is disabled
+        until a directory is set by configure(). """
+
+    def __init__(self, version, encode=None, decode=None):
+        self.version = version
+        self.encode = encode or (lambda value: value)
+        self.decode = decode or (lambda data: data)
+        self.path = None
+        self.maxsize = 0
+
+    def configure(self, path, maxsize):
+        """ Set the directory and its maximum size in bytes. A path of None
+            disables the cache. """
+        self.path = path
+        self.maxsize = maxsize
+
+    @property
+    def enabled(self):
+        return self.path is not None
+
+    def _entry_path(self, key):
+        data = '\0'.join((str(self.version),) + key).encode('utf-8')
+        digest = hashlib.sha1(data).hexdigest()
+        return os.path.join(self.path, digest[:2], digest[2:])
+
+    def get(self, key, default=None):
+        """ Get an entry, where the key is a tuple of strings """
+        if self.path is None:
+            return default
+        path = self._entry_path(key)
+        try:
+            with io.open(path, 'r', encoding='utf-8') as entry_file:
+                value = self.decode(json.load(entry_file))
+        except Exception:  # pylint: disable=broad-except
+            return default
+        try:
+            # Mark the entry as recently used, for evict()
+            os.utime(path, None)
+        except OSError:
+            pass
+        return value
+
+    def put(self, key, value):
+        """ Add an entry, silently doing nothing if it cannot be written """
+        if self.path is None:
+            return
+        path = self._entry_path(key)
+        tmp_path = None
+        try:
+            directory = os.path.dirname(path)
+            if not os.path.isdir(directory):
+                try:
+                    os.makedirs(directory)
+                except OSError:
+                    if not os.path.isdir(directory):
+                        raise
+            data = json.dumps(self.encode(value), separators=(',', ':'))
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=TMP_PREFIX)
+            with os.fdopen(fd, 'wb') as entry_file:
+                entry_file.write(data.encode('utf-8'))
+            replace_file(tmp_path, path)
+        except (IOError, OSError, TypeError, ValueError):
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def entries(self):
+        """ Yield the path, size and modification time of every entry """
+        for root, _, filenames in os.walk(self.path):
+            for filename in filenames:
+                path = os.path.join(root, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def evict(self):
+        """ Remove the least recently used entries until the cache is no
+            larger than its maximum size, and any temporary files left
+            behind by interrupted writes. Returns the number of files
+            removed. """
+        if self.path is None or not os.path.isdir(self.path):
+            return 0
+        now = time.time()
+        entries = []
+        removed = []
+        for path, size, mtime in self.entries():
+            if os.path.basename(path).startswith(TMP_PREFIX):
+                if now - mtime > STALE_TMP_AGE:
+                    removed.append(path)
+            else:
+                entries.append((mtime, size, path))
+        total = sum(size for _, size, _ in entries)
+        entries.sort()
+        while entries and total > self.maxsize:
+            _, size, path = entries.pop(0)
+            total -= size
+            removed.append(path)
+        for path in removed:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        return len(removed)
@@ -1,214 +1,50 @@
 """ C# sphinx domain """
 
-import re
-from collections import namedtuple
+import os
 from docutils import nodes
-from docutils.parsers.rst import Directive
+from docutils.parsers.rst import Directive, directives
+from docutils.statemachine import StringList
 from sphinx import addnodes
 from sphinx.domains import Domain, ObjType
+from sphinx.errors import ConfigError
 from sphinx.locale import _
 from sphinx.directives import ObjectDescription
 from sphinx.roles import XRefRole
+from sphinx.util import logging
 from sphinx.util.nodes import make_refnode
-
-MODIFIERS_RE = '|'.join(['public', 'private', 'internal', 'protected',
-                         'abstract', 'async', 'const', 'event',
-                         'extern', 'new', 'override', 'partial',
-                         'readonly', 'sealed', 'static', 'unsafe',
-                         'virtual', 'volatile'])
-PARAM_MODIFIERS_RE = '|'.join(['ref', 'out', 'params'])
-
-METH_SIG_RE = re.compile(
-    r'^((?:(?:' + MODIFIERS_RE +
-    r')\s+)*)([^\s]+\s+)*([^\s<]+)\s*(<[^\(]+>)?\s*\((.*)\)$')
-PROP_SIG_RE = re.compile(
-    r'^([^\s]+\s+)*([^\s]+)\s+([^\s]+)\s*\{\s*(get;)?\s*(set;)?\s*\}$')
-IDXR_SIG_RE = re.compile(
-    r'^((?:(?:' + MODIFIERS_RE +
-    r')\s+)*)([^\s]+)\s*this\s*\[\s*((?:[^\s]+)\s+(?:[^\s]+)' +
-    r'(?:\s*,\s*(?:[^\s]+)\s+(?:[^\s]+))*)\s*\]\s*' +
-    r'\{\s*(get;)?\s*(set;)?\s*\}$')
-PARAM_SIG_RE = re.compile(
-    r'^((?:(?:' + PARAM_MODIFIERS_RE +
-    r')\s+)*)([^\s]+)\s+([^\s]+)\s*(=\s*(.+))?$')
-TYPE_SIG_RE = re.compile(r'^([^\s<\[]+)\s*(<.+>)?\s*(\[\])?$')
-ATTR_SIG_RE = re.compile(r'^([^\s]+)(\s+\((.*)\))?$')
-ParamTuple = namedtuple('ParamTuple', ['name', 'typ', 'default', 'modifiers'])
-
-
-def split_sig(params):
-    """
-    Split a list of parameters/types by commas,
-    whilst respecting brackets.
-
-    For example:
-      String arg0, int arg2 = 1, List<int> arg3 = [1, 2, 3]
-      => ['String arg0', 'int arg2 = 1', 'List<int> arg3 = [1, 2, 3]']
-    """
-    result = []
-    current = ''
-    level = 0
-    for char in params:
-        if char in ('<', '{', '['):
-            level += 1
-        elif char in ('>', '}', ']'):
-            level -= 1
-        if char != ',' or level > 0:
-            current += char
-        elif char == ',' and level == 0:
-            result.append(current)
-            current = ''
-    if current.strip() != '':
-        result.append(current)
-    return result
-
-
-def parse_method_signature(sig):
-    """ Parse a method signature of the form: modifier* type name (params) """
-    match = METH_SIG_RE.match(sig.strip())
-    if not match:
-        raise RuntimeError('Method signature invalid: ' + sig)
-    modifiers, return_type, name, generic_types, params = match.groups()
-    if params.strip() != '':
-        params = split_sig(params)
-        params = [parse_param_signature(x) for x in params]
-    else:
-        params = []
-    return (modifiers.split(), return_type, name, generic_types, params)
-
-
-def parse_property_signature(sig):
-    """ Parse a property signature of the form:
-        modifier* type name { (get;)? (set;)? } """
-    match = PROP_SIG_RE.match(sig.strip())
-    if not match:
-        raise RuntimeError('Property signature invalid: ' + sig)
-    groups = match.groups()
-    if groups[0] is not None:
-        modifiers = [x.strip() for x in groups[:-4]]
-        groups = groups[-4:]
-    else:
-        modifiers = []
-        groups = groups[1:]
-    typ, name, getter, setter = groups
-    return (modifiers, typ, name, getter is not None, setter is not None)
-
-
-def parse_indexer_signature(sig):
-    """ Parse a indexer signature of the form:
-        modifier* type this[params] { (get;)? (set;)? } """
-    match = IDXR_SIG_RE.match(sig.strip())
-    if not match:
-        raise RuntimeError('Indexer signature invalid: ' + sig)
-    modifiers, return_type, params, getter, setter = match.groups()
-    params = split_sig(params)
-    params = [parse_param_signature(x) for x in params]
-    return (modifiers.split(), return_type, params,
-            getter is not None, setter is not None)
-
-
-def parse_param_signature(sig):
-    """ Parse a parameter signature of the form: type name (= default)? """
-    match = PARAM_SIG_RE.match(sig.strip())
-    if not match:
-        raise RuntimeError('Parameter signature invalid, got ' + sig)
-    groups = match.groups()
-    modifiers = groups[0].split()
-    typ, name, _, default = groups[-4:]
-    return ParamTuple(name=name, typ=typ,
-                      default=default, modifiers=modifiers)
-
-
-def parse_type_signature(sig):
-    """ Parse a type signature """
-    match = TYPE_SIG_RE.match(sig.strip())
-    if not match:
-        raise RuntimeError('Type signature invalid, got ' + sig)
-    groups = match.groups()
-    typ = groups[0]
-    generic_types = groups[1]
-    if not generic_types:
-        generic_types = []
-    else:
-        generic_types = split_sig(generic_types[1:-1])
-    is_array = (groups[2] is not None)
-    return typ, generic_types, is_array
-
-
-def parse_attr_signature(sig):
-    """ Parse an attribute signature """
-    match = ATTR_SIG_RE.match(sig.strip())
-    if not match:
-        raise RuntimeError('Attribute signature invalid, got ' + sig)
-    name, _, params = match.groups()
-    if params is not None and params.strip() != '':
-        params = split_sig(params)
-        params = [parse_param_signature(x) for x in params]
-    else:
-        params = []
-    return (name, params)
-
-
-MSDN_VALUE_TYPES = {
-    'string': 'System.String',
-    'int': 'System.Int32',
-    'long': 'System.Int64',
-    'uint': 'System.UInt32',
-    'ulong': 'System.UInt64',
-    'float': 'System.Single',
-    'double': 'System.Double',
-    'byte': 'System.Byte',
-    'bool': 'System.Boolean'
-}
-
-
-MSDN_LINK_MAP = {
-    'System.Collections.Generic.List': 'https://docs.microsoft.com/en-us/dotnet/api/system.collections.generic.list-1',  # noqa  # pylint: disable=line-too-long
-    'System.Collections.Generic.Dictionary': 'https://docs.microsoft.com/en-us/dotnet/api/system.collections.generic.dictionary-2',  # noqa  # pylint: disable=line-too-long
-    'System.Collections.Generic.IList': 'https://docs.microsoft.com/en-us/dotnet/api/system.collections.generic.ilist-1',  # noqa  # pylint: disable=line-too-long
-    'System.Collections.Generic.IDictionary': 'https://docs.microsoft.com/en-us/dotnet/api/system.collections.generic.idictionary-2',  # noqa  # pylint: disable=line-too-long
-    'System.Collections.Generic.ISet': 'https://docs.microsoft.com/en-us/dotnet/api/system.collections.generic.iset-1',  # noqa  # pylint: disable=line-too-long
-    'System.Collections.Generic.IEnumerable': 'https://docs.microsoft.com/en-us/dotnet/api/system.collections.generic.ienumerable-1'  # noqa  # pylint: disable=line-too-long
-}
-
-
-def get_msdn_ref(name):
-    """ Try and create a reference to a type on MSDN """
-    in_msdn = False
-    if name in MSDN_VALUE_TYPES:
-        name = MSDN_VALUE_TYPES[name]
-        in_msdn = True
-    if name.startswith('System.'):
-        in_msdn = True
-    if in_msdn:
-        link = name.split('<')[0]
-        link = MSDN_LINK_MAP.get(link, link.lower())
-        url = ''
-        if link.startswith('https://'):
-            url = link
-        else:
-            url = 'https://docs.microsoft.com/en-us/dotnet/api/' + link
-        node = nodes.reference(name, shorten_type(name))
-        node['refuri'] = url
-        node['reftitle'] = name
-        return node
-    return None
-
-
-SHORTEN_TYPE_PREFIXES = [
-    'System.',
-    'System.Collections.Generic.'
-]
-
-
-def shorten_type(typ):
-    """ Shorten a type. E.g. drops 'System.' """
-    offset = 0
-    for prefix in SHORTEN_TYPE_PREFIXES:
-        if typ.startswith(prefix):
-            if len(prefix) > offset:
-                offset = len(prefix)
-    return typ[offset:]
+from sphinx_csharp import export, links, search, signatures, stats, \
+    typerefs, xmldoc
+from sphinx_csharp.inventory import InventoryIndex, get_item, strip_generics
+from sphinx_csharp.members import csharp_members, CSharpMembers, \
+    ExpandMemberTables
+from sphinx_csharp.references import ResolveReferences, could_refer_to, \
+    get_msdn_url, make_xref_node, qualify_name, reference_name, \
+    resolve_outcome, scope_targets, split_reference
+from sphinx_csharp.signatures import MSDN_VALUE_TYPES, SIGNATURE_CACHE, \
+    SIGNATURE_DISK_CACHE, format_type, parse_attr_signature, \
+    parse_indexer_signature, parse_method_signature, \
+    parse_property_signature, parse_type_signature, signature_id
+from sphinx_csharp.stats import PROFILER, STATS
+from sphinx_csharp.store import STORES, intern
+from sphinx_csharp.typerefs import ExpandTypes, desc_csharp_type, \
+    get_type_names
+
+logger = logging.getLogger(__name__)
+
+
+def is_hidden(modifiers):
+    """ Whether an object with the given modifiers is hidden from users of
+        its assembly, i.e. is private, private protected or internal """
+    return 'private' in modifiers or \
+        ('internal' in modifiers and 'protected' not in modifiers)
+
+
+def warn_duplicate(env, key, other_docname, location):
+    """ Warn about an object that is described more than once """
+    objtype, name, _ = key
+    logger.warning('duplicate description of %s %s, other instance in %s',
+                   objtype, name, env.doc2path(other_docname),
+                   location=location)
 
 
 class CSharpObject(ObjectDescription):
@@ -218,29 +54,52 @@ class CSharpObject(ObjectDescription):
         super(CSharpObject, self).__init__(*args, **kwargs)
         self.parentname_set = None
         self.parentname_saved = None
+        # Identifies the overload described by the current signature, for
+        # objects that can be overloaded
+        self.sigid = ''
+        # Whether the object described by the current signature is hidden
+        # from the search index
+        self.hidden = False
+        self.profile_name = None
+        if PROFILER.enabled:
+            # Sphinx may wrap domain directives in an adapter class
+            self.profile_name = next(
+                cls.__name__ for cls in type(self).__mro__
+                if cls.__module__ == __name__)
+            self.handle_signature = PROFILER.wrap(
+                'signature.' + self.profile_name, self.handle_signature)
+
+    def run(self):
+        with PROFILER.timer('directive.%s' % self.profile_name):
+            return super(CSharpObject, self).run()
 
-    def add_target_and_index(self, name, _, signode):
+    def add_target_and_index(self, name, sig, signode):
+        # Overloads are anchored by their signature id, and the first
+        # overload in the document also by the name alone
         targetname = self.objtype + '-' + name
-        if targetname not in self.state.document.ids:
-            signode['names'].append(targetname)
-            signode['ids'].append(targetname)
+        anchor = targetname
+        if self.sigid:
+            anchor += '-' + self.sigid
+        if anchor not in self.state.document.ids:
+            ids = [anchor]
+            if anchor != targetname and \
+               targetname not in self.state.document.ids:
+                ids.insert(0, targetname)
+            signode['names'].extend(ids)
+            signode['ids'].extend(ids)
             signode['first'] = (not self.names)
+            # Kept for the symbol export
+            signode['csharp:fullname'] = name
+            signode['csharp:signature'] = sig
             self.state.document.note_explicit_target(signode)
 
-            objects = self.env.domaindata['csharp']['objects']
-            key = (self.objtype, name)
-            if key in objects:
-                self.env.warn(self.env.docname,
-                              'duplicate description of %s %s, ' %
-                              (self.objtype, name) +
-                              'other instance in ' +
-                              self.env.doc2path(objects[key]),
-                              self.lineno)
-            objects[key] = self.env.docname
+            domain = self.env.get_domain('csharp')
+            domain.note_object(self.objtype, name, self.lineno, self.sigid,
+                               self.hidden)
         indextext = self.get_index_text(name)
         if indextext:
             self.indexnode['entries'].append(
-                ('single', indextext, targetname, ''))
+                ('single', indextext, anchor, ''))
 
     def get_index_text(self, name):
         if self.objtype == 'directive':
@@ -284,25 +143,28 @@ class CSharpObject(ObjectDescription):
             signode += nodes.Text(u' ')
 
     def append_type(self, node, typ):
-        typ, generic_types, is_array = parse_type_signature(typ)
-        tnode = addnodes.pending_xref(
-            '', refdomain='csharp', reftype='type',
-            reftarget=typ, modname=None, classname=None)
-        if not self.has_parent():
-            tnode['csharp:parent'] = None
-        else:
-            tnode['csharp:parent'] = self.get_parent()
-        tnode += nodes.Text(shorten_type(typ))
-        node += tnode
-        if generic_types:
-            node += nodes.Text('<')
-            for i, typ_param in enumerate(generic_types):
-                self.append_type(node, typ_param)
-                if i != len(generic_types)-1:
-                    node += nodes.Text(', ')
-            node += nodes.Text('>')
-        if is_array:
-            node += nodes.Text('[]')
+        with PROFILER.timer('append_type'):
+            text = format_type(typ)
+            tnode = desc_csharp_type(text, text)
+            tnode['csharp:type'] = typ
+            tnode['csharp:parent'] = \
+                self.get_parent() if self.has_parent() else None
+            node += tnode
+
+    @staticmethod
+    def append_accessors(signode, getter, setter):
+        """ Append the accessors of a property or indexer, if known """
+        extra = []
+        if getter:
+            extra.append('get;')
+        if setter:
+            extra.append('set;')
+        if not extra:
+            return
+        signode += nodes.Text(' { ')
+        extra_str = ' '.join(extra)
+        signode += addnodes.desc_annotation(extra_str, extra_str)
+        signode += nodes.Text(' }')
 
     def append_parameters(self, node, params):
         pnodes = addnodes.desc_parameterlist()
@@ -359,20 +221,20 @@ class CSharpClass(CSharpObject):
     """ Description of a C# class """
 
     def handle_signature(self, sig, signode):
-        typ, _, _ = parse_type_signature(sig)
+        typ = parse_type_signature(sig)
         desc_name = 'class %s' % sig
         signode += addnodes.desc_name(desc_name, desc_name)
-        return self.get_fullname(typ)
+        return self.get_fullname(typ.name)
 
 
 class CSharpInherits(CSharpObject):
     """ Description of an inherited C# class """
 
     def handle_signature(self, sig, signode):
-        typ, _, _ = parse_type_signature(sig)
+        typ = parse_type_signature(sig)
         signode += nodes.Text(': ')
-        self.append_type(signode, sig)
-        return self.get_fullname(typ)
+        self.append_type(signode, typ)
+        return self.get_fullname(typ.name)
 
 
 class CSharpMethod(CSharpObject):
@@ -380,16 +242,19 @@ class CSharpMethod(CSharpObject):
 
     def handle_signature(self, sig, signode):
         modifiers, typ, name, \
-            generic_types, params = parse_method_signature(sig)
+            generic_params, params = parse_method_signature(sig)
         self.append_modifiers(signode, modifiers)
         if typ is not None:
             self.append_type(signode, typ)
             signode += nodes.Text(' ')
         signode += addnodes.desc_name(name, name)
-        if generic_types is not None:
-            signode += nodes.Text(generic_types)
+        if generic_params:
+            generic_text = '<' + ', '.join(generic_params) + '>'
+            signode += nodes.Text(generic_text)
         signode += nodes.Text(' ')
         self.append_parameters(signode, params)
+        self.sigid = signature_id(params)
+        self.hidden = is_hidden(modifiers)
         return self.get_fullname(name)
 
 
@@ -399,18 +264,12 @@ class CSharpProperty(CSharpObject):
     def handle_signature(self, sig, signode):
         modifiers, typ, name, getter, setter = parse_property_signature(sig)
         self.append_modifiers(signode, modifiers)
-        self.append_type(signode, typ)
-        signode += nodes.Text(' ')
+        if typ is not None:
+            self.append_type(signode, typ)
+            signode += nodes.Text(' ')
         signode += addnodes.desc_name(name, name)
-        signode += nodes.Text(' { ')
-        extra = []
-        if getter:
-            extra.append('get;')
-        if setter:
-            extra.append('set;')
-        extra_str = ' '.join(extra)
-        signode += addnodes.desc_annotation(extra_str, extra_str)
-        signode += nodes.Text(' }')
+        self.append_accessors(signode, getter, setter)
+        self.hidden = is_hidden(modifiers)
         return self.get_fullname(name)
 
 
@@ -420,19 +279,14 @@ class CSharpIndexer(CSharpObject):
     def handle_signature(self, sig, signode):
         modifiers, typ, params, getter, setter = parse_indexer_signature(sig)
         self.append_modifiers(signode, modifiers)
-        self.append_type(signode, typ)
-        signode += nodes.Text(' ')
+        if typ is not None:
+            self.append_type(signode, typ)
+            signode += nodes.Text(' ')
         signode += addnodes.desc_name('this[]', 'this')
         self.append_indexer_parameters(signode, params)
-        signode += nodes.Text(' { ')
-        extra = []
-        if getter:
-            extra.append('get;')
-        if setter:
-            extra.append('set;')
-        extra_str = ' '.join(extra)
-        signode += addnodes.desc_annotation(extra_str, extra_str)
-        signode += nodes.Text(' }')
+        self.append_accessors(signode, getter, setter)
+        self.sigid = signature_id(params)
+        self.hidden = is_hidden(modifiers)
         return self.get_fullname('this[]')
 
 
@@ -466,6 +320,40 @@ class CSharpAttribute(CSharpObject):
         return self.get_fullname(name)
 
 
+class CSharpXmlDoc(Directive):
+    """ Document the members in a C# compiler XML documentation file """
+
+    has_content = False
+    required_arguments = 1
+    optional_arguments = 0
+    final_argument_whitespace = True
+    option_spec = {'namespace': directives.unchanged}
+
+    def run(self):
+        env = self.state.document.settings.env
+        relpath, path = env.relfn2path(self.arguments[0])
+        env.note_dependency(relpath)
+        aliases = dict((name, alias)
+                       for alias, name in MSDN_VALUE_TYPES.items())
+        parent = env.ref_context.get('csharp:parent')
+        node = nodes.Element()
+        try:
+            # Parse each type as it is read, so the rst for the whole file
+            # is never held in memory
+            for lines in xmldoc.iter_rst(path, self.options.get('namespace'),
+                                         aliases):
+                self.state.nested_parse(StringList(lines, path), 0, node)
+        except (EnvironmentError, xmldoc.ParseError) as exn:
+            logger.warning('Failed to read C# XML documentation %s: %s',
+                           path, exn, location=(env.docname, self.lineno))
+        finally:
+            if parent is None:
+                env.ref_context.pop('csharp:parent', None)
+            else:
+                env.ref_context['csharp:parent'] = parent
+        return node.children
+
+
 class CSharpXRefRole(XRefRole):
     def process_link(self, env, refnode, has_explicit_title, title, target):
         refnode['csharp:parent'] = env.ref_context.get('csharp:parent')
@@ -497,6 +385,8 @@ class CSharpDomain(Domain):
         'value':     CSharpEnumValue,
         'attribute': CSharpAttribute,
         'indexer':   CSharpIndexer,
+        'xmldoc':    CSharpXmlDoc,
+        'members':   CSharpMembers,
     }
     roles = {
         'type': CSharpXRefRole(),
@@ -507,51 +397,470 @@ class CSharpDomain(Domain):
         'idxr': CSharpXRefRole(),
     }
     initial_data = {
-        'objects': {},  # fullname -> docname, objtype
+        'store': None,  # backend of the objects, see store.py
+        'refs': {},  # docname -> reference name -> set of (target, scope)
+        'referrers': {},  # reference name -> set of docnames
+        'tables': {},  # docname -> names member tables could list from
+        'table_referrers': {},  # name -> set of docnames with tables of it
+        'stats': {},  # statistics from the last parallel worker
+    }
+    data_version = 10
+
+    #: Search result priorities of each object type. Types come first, and
+    #: other objects (e.g. inherits) and objects hidden from users of the
+    #: assembly are left out.
+    search_priorities = {
+        'class': 0,
+        'enum': 0,
+        'method': 1,
+        'property': 1,
+        'indexer': 1,
+        'attribute': 1,
+        'value': 2,
     }
 
+    def __init__(self, env):
+        super(CSharpDomain, self).__init__(env)
+        # The store is opened when first used, as the config may not have
+        # been read yet
+        self._store = None
+        # The targets found by resolve_xref, cleared whenever objects are
+        # added or removed
+        self._xref_targets = {}
+        # The C# objects in intersphinx inventories, indexed when first
+        # used, after the inventories have been loaded
+        self._inventory = None
+        # Where objects added or removed in this build were before it, as
+        # (docname, hidden) or None for new objects, to find the documents
+        # referring to them. Not tracked if no document had references,
+        # e.g. in a fresh build.
+        self._old_locations = {} if self.data['refs'] else None
+
+    @property
+    def store(self):
+        """ The store of the described objects, with the backend chosen by
+            the csharp_object_store config value """
+        if self._store is None:
+            backend = self.env.config.csharp_object_store
+            if backend not in STORES:
+                raise ConfigError(
+                    'csharp_object_store must be one of %s, not %r' %
+                    (', '.join(sorted(STORES)), backend))
+            previous = self.data['store']
+            if previous not in (None, backend):
+                STORES[previous].reset(self.data)
+            self.data['store'] = backend
+            self._store = STORES[backend](self.data, os.path.join(
+                self.env.doctreedir, 'csharp-objects.sqlite'))
+            if previous not in (None, backend):
+                self._store.lost = True
+        return self._store
+
+    def note_object(self, objtype, name, lineno, sigid='', hidden=False):
+        """ Add an object described in the current document. Overloads of
+            methods and indexers are identified by their signature id.
+            Hidden objects are left out of the search index. """
+        key = (objtype, name, sigid)
+        docname = self.get_docname(key)
+        if docname is not None:
+            warn_duplicate(self.env, key, docname,
+                           (self.env.docname, lineno))
+        self._add_object(key, self.env.docname, hidden)
+
+    def get_docname(self, key):
+        """ The document describing the object with the given
+            (objtype, fullname, sigid) key, or None """
+        return self.store.get_docname(key)
+
+    def _add_object(self, key, docname, hidden=False):
+        if self.get_docname(key) is not None:
+            self._remove_object(key)
+        elif self._old_locations is not None:
+            self._old_locations.setdefault(key, None)
+        self.store.add(key, docname, hidden)
+        self._xref_targets.clear()
+
+    def _remove_object(self, key):
+        location = self.store.remove(key)
+        if self._old_locations is not None:
+            self._old_locations.setdefault(key, location)
+        self._xref_targets.clear()
+
+    def find_object(self, objtypes, target, scope):
+        """ Find the object, with one of the given types, that target
+            refers to from within scope. Returns its (objtype, fullname)
+            key, or None if there is no such object. """
+        for depth, found in self.store.find_names(target, scope):
+            for objtype in objtypes:
+                if objtype in found:
+                    return objtype, qualify_name(target, scope, depth)
+        return None
+
+    def find_objects(self, target, scope):
+        """ Find all the objects, of any type, that target refers to from
+            within scope. Returns a list of (objtype, fullname) keys. """
+        for depth, found in self.store.find_names(target, scope):
+            fullname = qualify_name(target, scope, depth)
+            return [(objtype, fullname) for objtype in sorted(found)]
+        return []
+
+    def note_references(self, docname, refs):
+        """ Record the references made by a document, as a dict mapping
+            reference names to sets of (target, scope) """
+        self.data['refs'][docname] = refs
+        for name in refs:
+            self.data['referrers'].setdefault(name, set()).add(docname)
+
+    def note_member_tables(self, docname, parents):
+        """ Record the names of the types or namespaces that the member
+            tables in a document could list the members of """
+        self.data['tables'][docname] = parents
+        for parent in parents:
+            self.data['table_referrers'].setdefault(parent, set()).add(
+                docname)
+
+    def find_members(self, target, scope):
+        """ Find the type or namespace that target refers to from within
+            scope, which is the first with members. Returns its full name
+            and the (objtype, fullname, overloads, hidden sigids) of each
+            of its members. """
+        for parent in scope_targets(target, scope):
+            children = self.store.get_children(parent)
+            if children:
+                return parent, children
+        return target, []
+
+    def get_dependent_docs(self):
+        """ Get the documents with references that could resolve to objects
+            that were added, removed, moved to another document, hidden or
+            shown since this was last called """
+        fullnames = set(key[1] for key, location in
+                        (self._old_locations or {}).items()
+                        if self.store.get_location(key) != location)
+        self._old_locations = {}
+        docnames = set()
+        for fullname in fullnames:
+            # Member tables of the object's parent
+            docnames.update(self.data['table_referrers'].get(
+                fullname.rpartition('.')[0], ()))
+            name = reference_name(fullname)
+            for docname in self.data['referrers'].get(name, ()):
+                if docname not in docnames and any(
+                        could_refer_to(target, scope, fullname)
+                        for target, scope in self.data['refs'][docname][name]):
+                    docnames.add(docname)
+        return docnames
+
     def clear_doc(self, docname):
-        for (typ, name), doc in dict(self.data['objects']).items():
-            if doc == docname:
-                del self.data['objects'][typ, name]
+        with PROFILER.timer('clear_doc'):
+            for key in self.store.get_doc_keys(docname):
+                self._remove_object(key)
+            referrers = self.data['referrers']
+            for name in self.data['refs'].pop(docname, ()):
+                referrers[name].discard(docname)
+                if not referrers[name]:
+                    del referrers[name]
+            table_referrers = self.data['table_referrers']
+            for parent in self.data['tables'].pop(docname, ()):
+                table_referrers[parent].discard(docname)
+                if not table_referrers[parent]:
+                    del table_referrers[parent]
+            # Parallel workers are forked after the outdated documents are
+            # cleared, and need to see the changes
+            self.store.commit()
+
+    def check_consistency(self):
+        thorough = self.env.config.csharp_object_store_check
+        for problem in self.store.check(thorough):
+            logger.warning('C# domain %s', problem)
+        if not thorough:
+            # Rebuilding the indexes of the documents referring to each
+            # name visits every reference
+            return
+        referrers = {}
+        for docname, names in self.data['refs'].items():
+            for name in names:
+                referrers.setdefault(name, set()).add(docname)
+        if referrers != self.data['referrers']:
+            logger.warning('C# domain reference index is out of sync')
+        table_referrers = {}
+        for docname, parents in self.data['tables'].items():
+            for parent in parents:
+                table_referrers.setdefault(parent, set()).add(docname)
+        if table_referrers != self.data['table_referrers']:
+            logger.warning('C# domain member table index is out of sync')
 
     def resolve_xref(self, _, fromdocname, builder,
                      typ, target, node, contnode):
-        targets = [target]
-        if node['csharp:parent'] is not None:
-            parts = node['csharp:parent'].split('.')
-            while parts:
-                targets.append('.'.join(parts)+'.'+target)
-                parts = parts[:-1]
-
-        objects = self.data['objects']
+        with PROFILER.timer('resolve') as timer:
+            found = self.get_xref_target(typ, target, node['csharp:parent'],
+                                         node.get('csharp:arity'))
+            if found is None:
+                timer.name = 'resolve.unresolved'
+                return None
+            timer.name = resolve_outcome(found)
+            return make_xref_node(found, fromdocname, builder, contnode)
+
+    def get_xref_target(self, typ, target, scope, arity=None):
+        """ Find what a reference refers to, as find_xref_target does,
+            caching the result for the rest of the build """
+        cache_key = (typ, target, scope, arity)
+        if cache_key in self._xref_targets:
+            STATS.add('xref_cache_hits')
+            return self._xref_targets[cache_key]
+        STATS.add('xref_cache_misses')
+        found = self.find_xref_target(typ, target, scope, arity)
+        self._xref_targets[cache_key] = found
+        return found
+
+    def find_xref_target(self, typ, target, scope, arity=None):
+        """ Find what a reference refers to. Returns None if not found,
+            ('internal', docname, anchor, title) for a documented object,
+            ('inventory', fullname, project, version, uri) for an object in
+            an intersphinx inventory or ('external', name, url) for a type
+            on MSDN or in a link index. The generic arity of the type is
+            used to find external types, if known. """
+        name, sigid = split_reference(target)
+        if '<' in name:
+            # A constructed generic type, e.g. List<int>
+            name, target_arity = strip_generics(name)
+            if arity is None:
+                arity = target_arity
         objtypes = self.objtypes_for_role(typ)
-        for tgt in targets:
-            for objtype in objtypes:
-                if (objtype, tgt) in objects:
-                    return make_refnode(builder, fromdocname,
-                                        objects[objtype, tgt],
-                                        objtype + '-' + tgt,
-                                        contnode, tgt + ' ' + objtype)
-
-        for tgt in targets:
-            ref = get_msdn_ref(tgt)
-            if ref is not None:
-                return ref
+        key = self.find_object(objtypes, name, scope)
+        if key is not None:
+            found = self._get_target(key, sigid)
+            if found is None:
+                return None
+            objtype, fullname = key
+            return ('internal',) + found + (fullname + ' ' + objtype,)
+
+        found = self.inventory.find(objtypes, scope_targets(name, scope),
+                                    arity)
+        if found is not None:
+            return ('inventory', found[0]) + get_item(found[1])
+        for tgt in scope_targets(name, scope):
+            msdn = get_msdn_url(tgt, arity)
+            if msdn is not None:
+                return ('external',) + msdn
+        # Types in other projects can be referred to by their short name,
+        # if it is not ambiguous
+        found = self.inventory.find_suffix(objtypes, name, arity)
+        if found is not None:
+            return ('inventory', found[0]) + get_item(found[1])
         return None
 
+    @property
+    def inventory(self):
+        """ The index of the C# objects in the intersphinx inventories """
+        if self._inventory is None:
+            self._inventory = InventoryIndex(
+                getattr(self.env, 'intersphinx_inventory', None) or {})
+        return self._inventory
+
+    def _get_target(self, key, sigid):
+        """ Get the document and anchor of the object with the given
+            (objtype, fullname) key, or of its overload with the given
+            signature id if it is not None. Returns None if there is no
+            such overload. """
+        objtype, fullname = key
+        overloads = self.store.get_overloads(*key)
+        anchor = objtype + '-' + fullname
+        if sigid is None:
+            # Every document describing an overload anchors the first
+            # one by name alone
+            return overloads[min(overloads)], anchor
+        if sigid not in overloads:
+            return None
+        if sigid:
+            anchor += '-' + sigid
+        return overloads[sigid], anchor
+
     def get_objects(self):
-        for (typ, name), docname in self.data['objects'].items():
-            yield name, name, typ, docname, typ + '-' + name, 1
+        is_type = {}
+        for typ, name, overloads, hidden in self.store.iter_names():
+            visible = [sigid for sigid in overloads if sigid not in hidden]
+            priority = self.search_priorities.get(typ, -1) if visible else -1
+            yield (name, self.get_display_name(name, is_type), typ,
+                   overloads[min(visible or overloads)], typ + '-' + name,
+                   priority)
+
+    def get_display_name(self, fullname, is_type=None):
+        """ The name of an object without its namespace, i.e. from the
+            outermost documented type containing it. Whether each prefix
+            of the name is a type is kept in is_type, if given. """
+        if is_type is None:
+            is_type = {}
+        parts = fullname.split('.')
+        for i in range(1, len(parts)):
+            prefix = '.'.join(parts[:i])
+            if prefix not in is_type:
+                objtypes = self.store.get_objtypes(prefix)
+                is_type[prefix] = 'class' in objtypes or 'enum' in objtypes
+            if is_type[prefix]:
+                return '.'.join(parts[i-1:])
+        return parts[-1]
+
+    def get_full_qualified_name(self, node):
+        target = node.get('reftarget')
+        if target is None:
+            return None
+        name = split_reference(target)[0]
+        scope = node.get('csharp:parent')
+        keys = self.find_objects(name, scope)
+        if keys:
+            return keys[0][1]
+        return scope + '.' + name if scope else name
 
     def merge_domaindata(self, docnames, otherdata):
-        # TODO: implement to allow parallel builds
-        raise NotImplementedError
+        for key, docname, hidden in self.store.merged_objects(otherdata):
+            if docname not in docnames:
+                continue
+            other_docname = self.get_docname(key)
+            if other_docname not in (None, docname):
+                warn_duplicate(self.env, key, other_docname, docname)
+            self._add_object(key, docname, hidden)
+        for docname, names in otherdata['refs'].items():
+            if docname in docnames:
+                self.note_references(docname, names)
+        for docname, parents in otherdata['tables'].items():
+            if docname in docnames:
+                self.note_member_tables(docname, parents)
+        STATS.merge(otherdata['stats'])
 
     def resolve_any_xref(self, env, fromdocname, builder,
                          target, node, contnode):
-        raise NotImplementedError
+        with PROFILER.timer('resolve_any'):
+            return self._resolve_any_xref(fromdocname, builder, target,
+                                          node, contnode)
+
+    def _resolve_any_xref(self, fromdocname, builder, target, node,
+                          contnode):
+        results = []
+        name, sigid = split_reference(target)
+        for key in self.find_objects(name, node.get('csharp:parent')):
+            found = self._get_target(key, sigid)
+            if found is None:
+                continue
+            objtype, fullname = key
+            refnode = make_refnode(builder, fromdocname, found[0], found[1],
+                                   contnode, fullname + ' ' + objtype)
+            results.append(('csharp:' + self.role_for_objtype(objtype),
+                            refnode))
+        return results
+
+
+def init_build(app):
+    SIGNATURE_CACHE.resize(app.config.csharp_signature_cache_size)
+    cache_dir = app.config.csharp_signature_cache_dir
+    if cache_dir:
+        cache_dir = os.path.join(app.confdir, cache_dir)
+    SIGNATURE_DISK_CACHE.configure(
+        cache_dir or None, app.config.csharp_signature_cache_dir_size)
+    link_indexes = [os.path.join(app.confdir, path)
+                    for path in app.config.csharp_link_indexes]
+    for path in link_indexes:
+        if not os.path.isfile(path):
+            raise ConfigError('csharp_link_indexes: no such file %s' % path)
+    links.set_user_indexes(link_indexes)
+    STATS.reset()
+    PROFILER.enabled = bool(app.config.csharp_profile)
+
+
+def save_worker_stats(app, _):
+    # Parallel workers only send back the environment, so keep the
+    # statistics there to be merged by merge_domaindata
+    app.env.domaindata['csharp']['stats'] = STATS.snapshot()
+
+
+def note_references(app, doctree):
+    # Record all references that might resolve to a C# object, resolved
+    # or not, so the documents can be rewritten when those objects change
+    refs = {}
+    findall = getattr(doctree, 'findall', doctree.traverse)
+    for node in findall(addnodes.pending_xref):
+        if node.get('refdomain') == 'csharp' or node.get('reftype') == 'any':
+            target = node['reftarget']
+            scope = node.get('csharp:parent')
+            refs.setdefault(intern(reference_name(target)), set()).add(
+                (intern(target), None if scope is None else intern(scope)))
+    # Types in signatures are expanded into references when resolved
+    for node in findall(desc_csharp_type):
+        scope = node['csharp:parent']
+        for target, _ in get_type_names(node['csharp:type']):
+            refs.setdefault(intern(reference_name(target)), set()).add(
+                (intern(target), None if scope is None else intern(scope)))
+    domain = app.env.get_domain('csharp')
+    domain.note_references(intern(app.env.docname), refs)
+    # Member tables list the members of the first of these with members
+    parents = set()
+    for node in findall(csharp_members):
+        parents.update(intern(parent) for parent in scope_targets(
+            node['csharp:target'], node['csharp:parent']))
+    if parents:
+        domain.note_member_tables(intern(app.env.docname), parents)
+
+
+def get_lost_docs(_, env, added, changed, removed):
+    # Reread all documents if the objects in the store were lost, e.g. if
+    # the SQLite database was removed or the backend was changed. Older
+    # versions of Sphinx pass the builder instead of the environment.
+    env = getattr(env, 'env', env)
+    if env.get_domain('csharp').store.lost:
+        return sorted(env.found_docs - added - changed - removed)
+    return []
+
+
+def commit_objects(_, env):
+    env.get_domain('csharp').store.commit()
+
+
+def get_dependent_docs(_, env):
+    # Rewrite, but don't reread, documents referring to changed objects
+    docnames = env.get_domain('csharp').get_dependent_docs()
+    return sorted(docname for docname in docnames if docname in env.all_docs)
 
 
 def setup(app):
     app.add_domain(CSharpDomain)
+    type_visitor = (typerefs.visit_desc_csharp_type,
+                    typerefs.depart_desc_csharp_type)
+    app.add_node(desc_csharp_type, html=type_visitor, latex=type_visitor,
+                 man=type_visitor, texinfo=type_visitor, text=type_visitor)
+    app.add_post_transform(ExpandTypes)
+    app.add_node(csharp_members)
+    app.add_post_transform(ExpandMemberTables)
+    app.add_post_transform(ResolveReferences)
+    # The script rebuilding the anchors in search results, added to the
+    # pages of the HTML builders and copied by copy_search_script
+    add_js_file = getattr(app, 'add_js_file', None) or \
+        getattr(app, 'add_javascript')
+    add_js_file(search.SEARCH_SCRIPT)
+    app.add_config_value('csharp_signature_cache_size', 4096, '')
+    app.add_config_value('csharp_signature_cache_dir', None, '')
+    app.add_config_value('csharp_signature_cache_dir_size', 64 * 1024 * 1024,
+                         '')
+    app.add_config_value('csharp_link_indexes', [], 'env')
+    app.add_config_value('csharp_profile', False, '')
+    app.add_config_value('csharp_object_store', 'memory', 'env')
+    app.add_config_value('csharp_object_store_check', False, '')
+    app.add_config_value('csharp_symbol_export', None, '')
+    app.add_config_value('csharp_search_shards', False, 'html')
+    app.connect('builder-inited', init_build)
+    app.connect('builder-inited', search.copy_search_script)
+    app.connect('doctree-read', note_references)
+    app.connect('doctree-read', save_worker_stats)
+    app.connect('env-get-outdated', get_lost_docs)
+    app.connect('env-updated', commit_objects)
+    app.connect('env-updated', get_dependent_docs)
+    app.connect('doctree-resolved', export.export_symbols)
+    app.connect('build-finished', export.write_symbol_export)
+    app.connect('build-finished', search.write_search_index)
+    app.connect('build-finished', stats.report_stats)
+    app.connect('build-finished', stats.report_profile)
+    app.connect('build-finished', signatures.evict_signatures)
+    return {
+        'env_version': CSharpDomain.data_version,
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
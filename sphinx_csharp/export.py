@@ -0,0 +1,153 @@
+""" Export of the documented C# objects as JSON lines
+
+Each object is written as a JSON object on its own line, with its kind,
+full name, parsed signature, document, anchor and the links in its
+signature. The records of each document are written to a fragment file
+when the document is resolved, so an incremental build only rewrites the
+fragments of the documents it writes. At the end of the build the
+fragments are concatenated into the export file, one at a time, so the
+whole export is never held in memory.
+"""
+
+import io
+import json
+import os
+import shutil
+from docutils import nodes
+from sphinx import addnodes
+from sphinx.util import logging
+from sphinx_csharp.signatures import EXPORT_PARSERS
+from sphinx_csharp.typerefs import desc_csharp_type, get_type_refs
+
+try:
+    from urllib.parse import quote
+except ImportError:
+    from urllib import quote
+
+try:
+    replace_file = os.replace
+except AttributeError:
+    # Python 2's rename replaces existing files on POSIX only
+    def replace_file(src, dst):
+        """ Rename src to dst, replacing dst """
+        if os.path.exists(dst):
+            os.remove(dst)
+        os.rename(src, dst)
+
+logger = logging.getLogger(__name__)
+
+FRAGMENT_SUFFIX = '.jsonl'
+
+
+def to_json(value):
+    """ Convert a parsed signature into JSON compatible values, with named
+        tuples as objects """
+    if hasattr(value, '_asdict'):
+        return dict((name, to_json(field))
+                    for name, field in value._asdict().items())
+    if isinstance(value, (tuple, list)):
+        return [to_json(item) for item in value]
+    return value
+
+
+def fragment_path(directory, docname):
+    return os.path.join(directory, quote(docname, safe='') + FRAGMENT_SUFFIX)
+
+
+def write_fragment(directory, docname, records):
+    """ Write the records of a document to its fragment file """
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    path = fragment_path(directory, docname)
+    with io.open(path + '.tmp', 'w', encoding='utf-8') as fragment:
+        for record in records:
+            fragment.write(json.dumps(record, sort_keys=True,
+                                      ensure_ascii=False) + u'\n')
+    replace_file(path + '.tmp', path)
+
+
+def has_fragment(directory, docname):
+    return os.path.exists(fragment_path(directory, docname))
+
+
+def write_export(path, directory, docnames):
+    """ Concatenate the fragments of the given documents, in order, into
+        the export file, and remove the fragments of other documents """
+    keep = set()
+    with io.open(path + '.tmp', 'wb') as export:
+        for docname in docnames:
+            fragment = fragment_path(directory, docname)
+            keep.add(os.path.basename(fragment))
+            with io.open(fragment, 'rb') as records:
+                shutil.copyfileobj(records, export)
+    replace_file(path + '.tmp', path)
+    for name in os.listdir(directory):
+        if name.endswith(FRAGMENT_SUFFIX) and name not in keep:
+            os.remove(os.path.join(directory, name))
+
+
+def get_export_dir(app):
+    """ The directory of the export fragments, kept with the doctrees so
+        that they last as long as the environment """
+    return os.path.join(app.doctreedir, 'csharp-export')
+
+
+def iter_export_records(doctree, docname):
+    """ Generate the export records of the objects described in a resolved
+        doctree """
+    findall = getattr(doctree, 'findall', doctree.traverse)
+    for desc in findall(addnodes.desc):
+        if desc.get('domain') != 'csharp':
+            continue
+        objtype = desc['objtype']
+        for signode in desc.children:
+            if 'csharp:fullname' not in signode:
+                continue
+            sig = signode['csharp:signature']
+            parse = EXPORT_PARSERS.get(objtype)
+            refs = []
+            for node in getattr(signode, 'findall', signode.traverse)(
+                    lambda node: isinstance(
+                        node, (nodes.reference, desc_csharp_type))):
+                if isinstance(node, desc_csharp_type):
+                    refs.extend(ref for ref in get_type_refs(node)
+                                if isinstance(ref, nodes.reference))
+                elif not isinstance(node.parent, desc_csharp_type):
+                    refs.append(node)
+            type_links = []
+            for ref in refs:
+                uri = ref.get('refuri') or '#' + ref.get('refid', '')
+                type_links.append({'text': ref.astext(), 'uri': uri,
+                                   'title': ref.get('reftitle')})
+            yield {
+                'kind': objtype,
+                'name': signode['csharp:fullname'],
+                'signature': sig,
+                'parsed': to_json(parse(sig)) if parse else None,
+                'docname': docname,
+                'anchor': signode['ids'][-1],
+                'links': type_links,
+            }
+
+
+def export_symbols(app, doctree, docname):
+    # Rewrite the records of each document that is resolved, which is
+    # each document the builder writes
+    if app.config.csharp_symbol_export:
+        write_fragment(get_export_dir(app), docname,
+                       iter_export_records(doctree, docname))
+
+
+def write_symbol_export(app, exception):
+    if exception is not None or not app.config.csharp_symbol_export:
+        return
+    directory = get_export_dir(app)
+    docnames = sorted(app.env.all_docs)
+    for docname in docnames:
+        if not has_fragment(directory, docname):
+            # Not written by this or a previous build, e.g. if the export
+            # has just been enabled
+            app.env.get_and_resolve_doctree(docname, app.builder)
+    path = os.path.join(app.outdir, app.config.csharp_symbol_export)
+    write_export(path, directory, docnames)
+    logger.info('C# symbols exported to %s', path)
@@ -0,0 +1,138 @@
+""" Index of the C# objects in intersphinx inventories
+
+Intersphinx loads the inventories of other projects into a dict of
+'domain:objtype' to a dict of object names to inventory items. Looking up
+a C# reference in it would mean trying each name the reference could refer
+to from within its scope, for each object type of its role, and generic
+types may be named with their arity (as in List`1 or List<T>) or without.
+
+The C# objects are instead indexed once per build by their names without
+generic arguments, so that a reference is found with one lookup per
+enclosing scope. Names are also indexed by each of their suffixes, e.g.
+Generic.List and List for System.Collections.Generic.List, so that a type
+can be referred to by its short name from outside its namespace, provided
+that the name is not ambiguous.
+"""
+
+import re
+
+#: The arity of a generic type in the CLR's naming, e.g. `1 in List`1
+ARITY_RE = re.compile(r'`(\d+)')
+
+
+def strip_generics(name):
+    """ Split a name into the name without generic arguments and the arity
+        of its last part, which is None if it is not given """
+    if '<' not in name and '`' not in name:
+        return name, None
+    stripped = []
+    args = None
+    depth = 0
+    start = 0
+    for index, char in enumerate(name):
+        if char == '<':
+            if depth == 0:
+                start = index + 1
+            depth += 1
+        elif char == '>':
+            depth -= 1
+            if depth == 0:
+                args = name[start:index]
+        elif depth == 0:
+            if char == '.':
+                args = None
+            stripped.append(char)
+    stripped = ''.join(stripped)
+    arity = None
+    if args is not None:
+        arity = count_args(args)
+    else:
+        match = ARITY_RE.search(stripped.rsplit('.', 1)[-1])
+        if match is not None:
+            arity = int(match.group(1))
+    return ARITY_RE.sub('', stripped), arity
+
+
+def count_args(args):
+    """ Count the comma separated arguments in a string, ignoring commas in
+        nested generic arguments """
+    depth = 0
+    count = 1
+    for char in args:
+        if char in '<(':
+            depth += 1
+        elif char in '>)':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            count += 1
+    return count
+
+
+def get_item(item):
+    """ The project, version and URI of an inventory item, which is a tuple
+        in older versions of Sphinx """
+    if hasattr(item, 'uri'):
+        return item.project_name, item.project_version, item.uri
+    return item[0], item[1], item[2]
+
+
+class InventoryIndex(object):
+    """ The C# objects in intersphinx inventories, indexed by name and
+        suffix """
+
+    def __init__(self, inventory):
+        # name -> objtype -> list of (arity, full name, inventory item)
+        self.names = {}
+        # suffix -> set of names
+        self.suffixes = {}
+        for key, objects in sorted(inventory.items()):
+            domain, _, objtype = key.partition(':')
+            if domain != 'csharp':
+                continue
+            for fullname, item in sorted(objects.items()):
+                name, arity = strip_generics(fullname)
+                self.names.setdefault(name, {}).setdefault(
+                    objtype, []).append((arity, fullname, item))
+                parts = name.split('.')
+                for i in range(1, len(parts)):
+                    self.suffixes.setdefault(
+                        '.'.join(parts[i:]), set()).add(name)
+
+    def __len__(self):
+        return len(self.names)
+
+    def _match(self, name, objtypes, arity):
+        """ Find an object with the given name, one of the given types and
+            the given arity, if not None. Objects without a known arity
+            match any arity. """
+        found = self.names.get(name)
+        if found is None:
+            return None
+        for objtype in objtypes:
+            for obj_arity, fullname, item in found.get(objtype, ()):
+                if arity is None or obj_arity in (None, arity):
+                    return fullname, item
+        return None
+
+    def find(self, objtypes, targets, arity=None):
+        """ Find the first of the targets that is the name of an object with
+            one of the given types. Returns its full name and inventory
+            item, or None. """
+        for target in targets:
+            found = self._match(target, objtypes, arity)
+            if found is not None:
+                return found
+        return None
+
+    def find_suffix(self, objtypes, target, arity=None):
+        """ Find the only object, with one of the given types, whose name
+            ends with target. Returns None if there is no such object, or
+            more than one. """
+        found = None
+        for name in self.suffixes.get(target, ()):
+            match = self._match(name, objtypes, arity)
+            if match is not None:
+                if found is not None:
+                    return None
+                found = match
+        return found
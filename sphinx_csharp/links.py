@@ -0,0 +1,204 @@
+""" Offline indexes of links to externally documented C# types
+
+An index is a text file with one type per line, sorted by the UTF-8 bytes
+of the type names. Generic types have their arity appended after a
+backtick, as in the CLR, e.g. System.Collections.Generic.Dictionary`2.
+A line may give the URL for the type after a tab, either absolute or
+relative to the base URL of the index. Otherwise the URL is the base URL
+followed by the lower case name, with the backtick replaced by a dash,
+which is the layout of the .NET API documentation. The base URL is set by
+a first line of the form:
+
+    #base https://example.com/api/
+
+Types nested in generic types are listed with the arity of the types
+containing them, e.g. System.Collections.Generic.List`1.Enumerator, and are
+found by their names without it, e.g. System.Collections.Generic.List.
+Enumerator.
+
+Indexes are memory mapped when first used and searched with a binary
+search, so they are never read into memory.
+
+An index can be generated from documentation in the ECMA XML format, as
+written by mdoc and used by the .NET API documentation (the xml directory
+of the dotnet-api-docs repository), which has a directory per namespace
+holding a file per type:
+
+    python -m sphinx_csharp.links [--prefix System] xml > dotnet.idx
+"""
+
+from __future__ import print_function
+
+import argparse
+import io
+import mmap
+import os
+import sys
+
+DOTNET_API_URL = 'https://docs.microsoft.com/en-us/dotnet/api/'
+
+#: Index of the .NET base class library, shipped with the extension
+DOTNET_INDEX_PATH = os.path.join(os.path.dirname(__file__), 'dotnet.idx')
+
+
+class LinkIndex(object):
+    """ A sorted index of type names, searched in place """
+
+    def __init__(self, path, base_url=DOTNET_API_URL):
+        self.path = path
+        self.base_url = base_url
+        self.data = None
+
+    def _open(self):
+        with open(self.path, 'rb') as index_file:
+            if os.fstat(index_file.fileno()).st_size == 0:
+                self.data = b''
+            else:
+                self.data = mmap.mmap(index_file.fileno(), 0,
+                                      access=mmap.ACCESS_READ)
+        if self.data[:6] == b'#base ':
+            end = self._line_end(0)
+            self.base_url = self.data[6:end].decode('utf-8').strip()
+
+    def _line_end(self, start):
+        end = self.data.find(b'\n', start)
+        return len(self.data) if end < 0 else end
+
+    def _lower_bound(self, key):
+        """ Find the start of the first line with a name >= key """
+        data = self.data
+        low = 0
+        high = len(data)
+        while low < high:
+            mid = (low + high) // 2
+            start = data.rfind(b'\n', 0, mid) + 1
+            end = self._line_end(start)
+            tab = data.find(b'\t', start, end)
+            if data[start:end if tab < 0 else tab] < key:
+                low = end + 1
+            else:
+                high = start
+        return low
+
+    def _entry(self, start):
+        """ Return the name and URL of the line starting at start """
+        end = self._line_end(start)
+        line = self.data[start:end].decode('utf-8').rstrip('\r')
+        name, _, url = line.partition('\t')
+        if not url:
+            url = name.lower().replace('`', '-')
+        if not url.startswith(('http://', 'https://')):
+            url = self.base_url + url
+        return name, url
+
+    def _find_prefix(self, prefix):
+        """ Find the first entry whose name starts with prefix """
+        start = self._lower_bound(prefix.encode('utf-8'))
+        if start >= len(self.data):
+            return None
+        name, url = self._entry(start)
+        if not name.startswith(prefix):
+            return None
+        return name, url
+
+    def find(self, name, arity=None):
+        """ Find the URL of a type with the given generic arity. If the
+            arity is None, a type with any arity is found. Returns None if
+            the type is not in the index. """
+        if self.data is None:
+            self._open()
+        found = self._find_type(name, arity)
+        if found is None:
+            return None
+        return found[1]
+
+    def _find_type(self, name, arity):
+        """ Find the name in the index and URL of a type """
+        key = name
+        if arity:
+            key += '`' + str(arity)
+        found = self._find_prefix(key)
+        if found is not None and found[0] == key:
+            return found
+        if arity is None:
+            found = self._find_prefix(key + '`')
+            if found is not None and '.' not in found[0][len(key):]:
+                return found
+        # A type nested in a generic type, named in the index with the
+        # arity of the type containing it
+        outer, _, inner = name.rpartition('.')
+        if not outer:
+            return None
+        found = self._find_type(outer, None)
+        if found is None or found[0] == outer:
+            return None
+        return self._find_type(found[0] + '.' + inner, arity)
+
+
+DOTNET_INDEX = LinkIndex(DOTNET_INDEX_PATH)
+
+#: The indexes searched by find_url, in order
+INDEXES = [DOTNET_INDEX]
+
+
+def set_user_indexes(paths):
+    """ Set the indexes to search before the .NET index """
+    INDEXES[:] = [LinkIndex(path) for path in paths] + [DOTNET_INDEX]
+
+
+def find_url(name, arity=None):
+    """ Find the URL of an externally documented type in the indexes """
+    for index in INDEXES:
+        url = index.find(name, arity)
+        if url is not None:
+            return url
+    return None
+
+
+def iter_ecma_types(path):
+    """ Generate the names of the types documented in a directory of ECMA
+        XML files, in the CLR's naming, e.g. List`1.Enumerator. Nested
+        types are in files named with a +, e.g. List`1+Enumerator.xml. """
+    for namespace in sorted(os.listdir(path)):
+        directory = os.path.join(path, namespace)
+        if not os.path.isdir(directory):
+            continue
+        for filename in sorted(os.listdir(directory)):
+            if filename.endswith('.xml'):
+                yield namespace + '.' + filename[:-4].replace('+', '.')
+
+
+def write_index(output, names, base_url=None):
+    """ Write an index of the given type names, in the order of their UTF-8
+        bytes as the binary search requires """
+    if base_url is not None:
+        output.write(u'#base %s\n' % base_url)
+    for name in sorted(set(names), key=lambda name: name.encode('utf-8')):
+        output.write(name + u'\n')
+
+
+def main(argv=None):
+    argparser = argparse.ArgumentParser(
+        prog='python -m sphinx_csharp.links',
+        description='Write a link index of the types documented in a '
+        'directory of ECMA XML files to standard output')
+    argparser.add_argument('path', help='the directory of ECMA XML files, '
+                           'with a subdirectory per namespace')
+    argparser.add_argument('--prefix', action='append', dest='prefixes',
+                           help='only include types whose full names start '
+                           'with this prefix')
+    argparser.add_argument('--base', metavar='url',
+                           help='the base URL of the documentation, if not '
+                           'the .NET API documentation')
+    args = argparser.parse_args(argv)
+    names = [name for name in iter_ecma_types(args.path)
+             if not args.prefixes or name.startswith(tuple(args.prefixes))]
+    output = io.open(sys.stdout.fileno(), 'w', encoding='utf-8',
+                     newline='\n', closefd=False)
+    with output:
+        write_index(output, names, args.base)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,258 @@
+""" Check the signatures of C# domain directives without building the docs
+
+Scans reStructuredText files for the directives of the C# domain, either
+written as csharp:directive or following a default-domain directive, and
+parses their signatures with the parsers used by the domain. Each invalid
+signature is reported as path:line:column: message, and the exit status is
+1 if any were found.
+
+Files are scanned in a pool of processes. Sphinx is not imported, so a
+check starts quickly, e.g. from a pre-commit hook. The results can be kept
+in a cache file, so that only files that have changed since the last check
+are scanned again.
+
+Usage: python -m sphinx_csharp.lint [options] path...
+"""
+
+from __future__ import print_function
+
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import re
+import sys
+from contextlib import closing
+from sphinx_csharp import parser
+
+#: The parser for the signatures of each directive. The signatures of the
+#: other directives are not parsed by the domain.
+PARSERS = {
+    'class': parser.parse_type,
+    'inherits': parser.parse_type,
+    'method': parser.parse_method,
+    'property': parser.parse_property,
+    'indexer': parser.parse_indexer,
+    'attribute': parser.parse_attr,
+}
+
+DIRECTIVE_RE = re.compile(
+    r'^(?P<indent>\s*)\.\.\s+(?:(?P<domain>[\w-]+):)?(?P<name>[\w-]+)::'
+    r'[ \t]*(?P<argument>.*)$')
+
+#: Files are checked in separate processes if there are more than this
+PARALLEL_THRESHOLD = 16
+
+
+def directive_signatures(lines, start, match):
+    """ Get the (line number, column, signature) of each signature in the
+        argument of a directive, given the match of the directive in the
+        line at start. The argument continues on the following lines that
+        are indented further, up to a blank line or option. """
+    argument = match.group('argument').strip()
+    if not argument.endswith('\\') and \
+       (start + 1 == len(lines) or not lines[start + 1].strip()):
+        # The usual case, of a single signature followed by a blank line
+        if not argument:
+            return []
+        return [(start + 1, match.start('argument') + 1, argument)]
+    indent = len(match.group('indent'))
+    parts = [(start, match.start('argument'), argument)]
+    for lineno in range(start + 1, len(lines)):
+        line = lines[lineno]
+        text = line.strip()
+        column = len(line) - len(line.lstrip())
+        if not text or text.startswith(':') or column <= indent:
+            break
+        parts.append((lineno, column, text))
+    signatures = []
+    sig = ''
+    sig_start = None
+    for lineno, column, text in parts:
+        if not sig:
+            sig_start = (lineno + 1, column + 1)
+        # A backslash at the end of a line continues the signature
+        if text.endswith('\\'):
+            sig += text[:-1]
+            continue
+        sig += text
+        if sig.strip():
+            signatures.append(sig_start + (sig.strip(),))
+        sig = ''
+    if sig.strip():
+        signatures.append(sig_start + (sig.strip(),))
+    return signatures
+
+
+def check_signature(name, sig, checked):
+    """ Parse the signature of a directive, returning the position and
+        message of the error, or None if it is valid. The shapes of valid
+        signatures are kept in checked, and a signature with the shape of
+        one already checked is valid without parsing it (see
+        parser.shape), so most signatures are never parsed. """
+    key = (name, parser.shape(sig))
+    if key in checked:
+        return None
+    try:
+        PARSERS[name](sig)
+    except parser.SignatureError as exn:
+        return exn.position, '%s (%s)' % (exn, exn.reason)
+    checked.add(key)
+    return None
+
+
+def check_lines(path, lines, default_domain=None, checked=None):
+    """ Check the signatures of the C# directives in the lines of a file.
+        Returns a list of (path, line, column, message). Signatures are
+        only parsed once if the same checked set is passed for each file.
+        """
+    diagnostics = []
+    domain = default_domain
+    if checked is None:
+        checked = set()
+    for index in [index for index, line in enumerate(lines)
+                  if '::' in line]:
+        match = DIRECTIVE_RE.match(lines[index])
+        if match is None:
+            continue
+        name, directive_domain = match.group('name', 'domain')
+        if directive_domain is None and name == 'default-domain':
+            domain = match.group('argument').strip() or None
+            continue
+        if (directive_domain or domain) != 'csharp' or name not in PARSERS:
+            continue
+        for lineno, column, sig in directive_signatures(lines, index,
+                                                        match):
+            error = check_signature(name, sig, checked)
+            if error is not None:
+                diagnostics.append((path, lineno, column + error[0],
+                                    error[1]))
+    return diagnostics
+
+
+#: The shapes of the valid signatures checked by this process
+CHECKED = set()
+
+
+def check_file(args):
+    """ Check the signatures in a file, given the path and default domain.
+        Returns a list of (path, line, column, message). """
+    path, default_domain = args
+    try:
+        with io.open(path, encoding='utf-8-sig') as rst_file:
+            lines = rst_file.read().splitlines()
+    except (EnvironmentError, UnicodeDecodeError) as exn:
+        return [(path, 0, 0, 'cannot read file: %s' % exn)]
+    return check_lines(path, lines, default_domain, CHECKED)
+
+
+def find_files(paths, suffixes):
+    """ Find the files with the given suffixes in the given files and
+        directories, in sorted order """
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames[:] = sorted(name for name in dirnames
+                                 if not name.startswith('.'))
+            for filename in sorted(filenames):
+                if filename.endswith(suffixes):
+                    yield os.path.join(dirpath, filename)
+
+
+def check_files(paths, default_domain=None, jobs=None):
+    """ Check the signatures in the given files, in a pool of jobs
+        processes if there are many. Returns a list of
+        (path, line, column, message) for each file. """
+    tasks = [(path, default_domain) for path in paths]
+    processes = jobs or multiprocessing.cpu_count()
+    if processes == 1 or len(tasks) <= PARALLEL_THRESHOLD:
+        return [check_file(task) for task in tasks]
+    with closing(multiprocessing.Pool(processes)) as pool:
+        results = pool.map(check_file, tasks,
+                           max(1, len(tasks) // (4 * processes)))
+    pool.join()
+    return results
+
+
+def file_state(path, default_domain):
+    """ The state of a file that the results of checking it depend on """
+    try:
+        stat = os.stat(path)
+    except EnvironmentError:
+        return None
+    return [stat.st_mtime, stat.st_size, default_domain]
+
+
+def read_cache(path):
+    """ Read the results of previous checks, mapping the path of each file
+        to its state and diagnostics. The results are discarded if they
+        are from another version of the parser. """
+    try:
+        with io.open(path, encoding='utf-8') as cache_file:
+            cache = json.load(cache_file)
+    except (EnvironmentError, ValueError):
+        return {}
+    if cache.get('version') != parser.VERSION:
+        return {}
+    return cache.get('files', {})
+
+
+def write_cache(path, files):
+    with io.open(path, 'w', encoding='utf-8') as cache_file:
+        cache_file.write(json.dumps({'version': parser.VERSION,
+                                     'files': files}) + u'\n')
+
+
+def check_changed_files(paths, default_domain=None, jobs=None, cache=None):
+    """ Check the signatures in the given files, reusing the results in
+        cache for the files that have not changed. Updates the cache, and
+        returns a list of (path, line, column, message) in the order of
+        the files. """
+    if cache is None:
+        cache = {}
+    states = dict((path, file_state(path, default_domain)) for path in paths)
+    changed = [path for path in paths
+               if states[path] is None or path not in cache or
+               cache[path][0] != states[path]]
+    for path, result in zip(changed, check_files(changed, default_domain,
+                                                 jobs)):
+        cache[path] = [states[path], [list(diagnostic[1:])
+                                      for diagnostic in result]]
+    return [(path,) + tuple(diagnostic)
+            for path in paths for diagnostic in cache[path][1]]
+
+
+def main(argv=None):
+    argparser = argparse.ArgumentParser(
+        prog='sphinx-csharp-lint', description=__doc__.splitlines()[0])
+    argparser.add_argument('paths', nargs='+', metavar='path',
+                           help='files, or directories to search for files')
+    argparser.add_argument('--default-domain',
+                           help='the domain of directives without one, '
+                           'e.g. csharp if it is the primary_domain')
+    argparser.add_argument('--suffix', action='append', dest='suffixes',
+                           help='suffix of the files to check in '
+                           'directories (default: .rst)')
+    argparser.add_argument('-j', '--jobs', type=int,
+                           help='number of processes (default: one per CPU)')
+    argparser.add_argument('--cache', metavar='path',
+                           help='file to keep the results in, so that only '
+                           'changed files are checked again')
+    args = argparser.parse_args(argv)
+
+    paths = list(find_files(args.paths, tuple(args.suffixes or ['.rst'])))
+    cache = read_cache(args.cache) if args.cache else {}
+    diagnostics = check_changed_files(paths, args.default_domain, args.jobs,
+                                      cache)
+    if args.cache:
+        write_cache(args.cache, cache)
+    for diagnostic in diagnostics:
+        print('%s:%d:%d: %s' % diagnostic)
+    return 1 if diagnostics else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
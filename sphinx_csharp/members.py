@@ -0,0 +1,97 @@
+""" Tables of the members of C# types and namespaces """
+
+from docutils import nodes
+from docutils.parsers.rst import Directive, directives
+from sphinx.transforms import SphinxTransform
+from sphinx.util import logging
+from sphinx.util.nodes import make_refnode
+
+logger = logging.getLogger(__name__)
+
+
+# pylint: disable=invalid-name
+class csharp_members(nodes.General, nodes.Element):
+    """ Placeholder for a table of the members of a type or namespace,
+        created by ExpandMemberTables when the doctree is resolved """
+# pylint: enable=invalid-name
+
+
+class CSharpMembers(Directive):
+    """ Summarize the members of a C# type or namespace in a table. The
+        members can be described in any document. """
+
+    has_content = False
+    required_arguments = 1
+    optional_arguments = 0
+    option_spec = {'private': directives.flag}
+
+    def run(self):
+        env = self.state.document.settings.env
+        node = csharp_members()
+        node['csharp:target'] = self.arguments[0]
+        node['csharp:parent'] = env.ref_context.get('csharp:parent')
+        node['private'] = 'private' in self.options
+        node.source, node.line = \
+            self.state_machine.get_source_and_line(self.lineno)
+        return [node]
+
+
+class ExpandMemberTables(SphinxTransform):
+    """ Replace each member table placeholder with a table of links to the
+        members, found with one lookup in the domain's objects """
+    default_priority = 6
+
+    #: The order of the kinds of members in the tables
+    kinds = ['class', 'enum', 'property', 'indexer', 'method', 'attribute',
+             'value']
+
+    def apply(self, **kwargs):
+        findall = getattr(self.document, 'findall', self.document.traverse)
+        domain = self.env.get_domain('csharp')
+        for node in list(findall(csharp_members)):
+            parent, children = domain.find_members(node['csharp:target'],
+                                                   node['csharp:parent'])
+            rows = self.get_rows(domain, children, node['private'])
+            if not rows:
+                logger.warning('no C# members found in %s',
+                               node['csharp:target'], location=node)
+                node.replace_self([])
+                continue
+            node.replace_self(self.make_table(parent, rows))
+
+    def get_rows(self, domain, children, private):
+        """ Get the (name, kind, docname, anchor) of each row of a table """
+        rows = []
+        for objtype, fullname, overloads, hidden in children:
+            if objtype not in self.kinds:
+                continue
+            visible = [sigid for sigid in overloads
+                       if private or sigid not in hidden]
+            if not visible:
+                continue
+            kind = domain.object_types[objtype].lname
+            if len(visible) > 1:
+                kind = '%s (%d overloads)' % (kind, len(visible))
+            rows.append((self.kinds.index(objtype),
+                         fullname.rsplit('.', 1)[-1], kind,
+                         overloads[min(visible)], objtype + '-' + fullname))
+        return [row[1:] for row in sorted(rows)]
+
+    def make_table(self, parent, rows):
+        table = nodes.table(classes=['csharp-members'])
+        tgroup = nodes.tgroup(cols=2)
+        table += tgroup
+        tgroup += nodes.colspec(colwidth=2)
+        tgroup += nodes.colspec(colwidth=1)
+        tbody = nodes.tbody()
+        for name, kind, docname, anchor in rows:
+            contnode = nodes.literal(name, name, classes=['xref', 'csharp'])
+            refnode = make_refnode(self.app.builder, self.env.docname,
+                                   docname, anchor, contnode,
+                                   parent + '.' + name)
+            row = nodes.row()
+            row += nodes.entry('', nodes.paragraph('', '', refnode))
+            row += nodes.entry('', nodes.paragraph(kind, kind))
+            tbody += row
+        tgroup += tbody
+        return table
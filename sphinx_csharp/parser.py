@@ -0,0 +1,515 @@
+""" Parser for C# signatures
+
+The signatures are split into tokens by a single regular expression that
+always matches at the first attempt, and the tokens are then consumed by a
+recursive descent parser that never backtracks. Parsing a signature
+therefore takes time linear in its length, even for malformed input.
+"""
+
+import re
+from collections import namedtuple
+
+MODIFIERS = frozenset([
+    'public', 'private', 'internal', 'protected', 'abstract', 'async',
+    'const', 'event', 'extern', 'new', 'override', 'partial', 'readonly',
+    'sealed', 'static', 'unsafe', 'virtual', 'volatile'])
+PARAM_MODIFIERS = frozenset(['ref', 'out', 'params', 'in', 'this'])
+ACCESSOR_MODIFIERS = frozenset(['private', 'protected', 'internal'])
+#: Modifiers of members, including those of ref returns (ref readonly)
+MEMBER_MODIFIERS = MODIFIERS | frozenset(['ref'])
+CONVERSION_KINDS = frozenset(['implicit', 'explicit'])
+
+#: The names whose text the parser depends on. Other names can be replaced
+#: without changing whether a signature parses, see shape().
+KEYWORDS = MEMBER_MODIFIERS | PARAM_MODIFIERS | ACCESSOR_MODIFIERS | \
+    CONVERSION_KINDS | frozenset(['operator', 'get', 'set', 'this',
+                                  'global'])
+
+#: Maximum nesting of generic arguments and tuples in a type
+MAX_NESTING = 64
+
+#: Version of the parsed signatures, which must be increased whenever they
+#: change so that signatures cached on disk are parsed again
+VERSION = 2
+
+#: A token and the whitespace before it
+TOKEN_RE = re.compile(r'''\s*(?:
+    (?P<name>@?[^\W\d]\w*(?:\.@?[^\W\d]\w*)*)
+  | (?P<string>@"(?:[^"]|"")*"?|"(?:[^"\\]|\\.)*"?)
+  | (?P<char>'(?:[^'\\]|\\.)*'?)
+  | (?P<number>\d[\w.]*)
+  | (?P<op>\S)
+)''', re.VERBOSE | re.UNICODE | re.DOTALL)
+
+#: A part of a name that is not a keyword, found without tokenizing
+SHAPE_RE = re.compile(r'(?<!\w)(?!(?:%s)(?!\w))[^\W\d]\w*' % '|'.join(
+    sorted(KEYWORDS)), re.UNICODE)
+
+OPENING_BRACKETS = {')': '(', ']': '[', '}': '{'}
+
+Token = namedtuple('Token', ['kind', 'text', 'start', 'end'])
+EOF = 'eof'
+
+
+class TypeSig(namedtuple('TypeSig', ['name', 'generic_args',
+                                     'tuple_elements', 'suffixes'])):
+    """ A type. Tuple types have no name and a tuple of elements.
+        Suffixes are the nullable, pointer and array specifiers, e.g.
+        ('?', '[]') """
+    __slots__ = ()
+
+    @property
+    def is_array(self):
+        return any(suffix.startswith('[') for suffix in self.suffixes)
+
+    @property
+    def is_nullable(self):
+        return '?' in self.suffixes
+
+    def __str__(self):
+        if self.tuple_elements:
+            result = '(' + ', '.join(
+                str(elem) for elem in self.tuple_elements) + ')'
+        else:
+            result = self.name
+            if self.generic_args:
+                result += '<' + ', '.join(
+                    str(arg) for arg in self.generic_args) + '>'
+        return result + ''.join(self.suffixes)
+
+
+class TupleElementSig(namedtuple('TupleElementSig', ['typ', 'name'])):
+    """ An element of a tuple type, with an optional name """
+    __slots__ = ()
+
+    def __str__(self):
+        if self.name is None:
+            return str(self.typ)
+        return '%s %s' % (self.typ, self.name)
+
+
+ParamSig = namedtuple('ParamSig', ['name', 'typ', 'default', 'modifiers'])
+MethodSig = namedtuple('MethodSig', ['modifiers', 'typ', 'name',
+                                     'generic_params', 'params'])
+PropertySig = namedtuple('PropertySig', ['modifiers', 'typ', 'name',
+                                         'getter', 'setter'])
+IndexerSig = namedtuple('IndexerSig', ['modifiers', 'typ', 'params',
+                                       'getter', 'setter'])
+AttrSig = namedtuple('AttrSig', ['name', 'params'])
+ReferenceSig = namedtuple('ReferenceSig', ['name', 'params'])
+
+
+class SignatureError(RuntimeError):
+    """ Raised when a signature cannot be parsed """
+
+    def __init__(self, kind, sig, reason, position):
+        super(SignatureError, self).__init__(
+            '%s signature invalid: %s' % (kind, sig))
+        self.sig = sig
+        self.reason = reason
+        self.position = position
+
+
+#: The parsed signature types, by name, for decode()
+SIGNATURE_TYPES = dict((cls.__name__, cls) for cls in (
+    TypeSig, TupleElementSig, ParamSig, MethodSig, PropertySig, IndexerSig,
+    AttrSig, ReferenceSig))
+
+
+def encode(value):
+    """ Convert a parsed signature into JSON compatible values, from which
+        decode() creates it again. Each tuple is a list of the name of its
+        type, or '' for a plain tuple, followed by its items. """
+    if isinstance(value, tuple):
+        name = type(value).__name__ if hasattr(value, '_fields') else ''
+        return [name] + [encode(item) for item in value]
+    return value
+
+
+def decode(data):
+    """ Create a parsed signature from the values returned by encode() """
+    if not isinstance(data, list):
+        return data
+    items = [decode(item) for item in data[1:]]
+    if not data[0]:
+        return tuple(items)
+    return SIGNATURE_TYPES[data[0]](*items)
+
+
+def shape(sig):
+    """ The signature with each part of a name that is not a keyword
+        replaced by N, e.g. N<N> N.N (N N) for List<int> Foo.Bar (int x).
+        The parser only looks at the text of keywords and at whether names
+        are qualified, so a signature parses if and only if its shape does,
+        and checking many signatures only needs to parse each shape once.
+        Names in literals are also replaced, which leaves them literals.
+        """
+    return SHAPE_RE.sub('N', sig)
+
+
+def tokenize(sig):
+    """ Split a signature into tokens, dropping whitespace """
+    tokens = []
+    append = tokens.append
+    new_token = tuple.__new__
+    # Trailing whitespace is left out, as no token follows it, so each
+    # attempt to match it would scan the rest of it again
+    for match in TOKEN_RE.finditer(sig, 0, len(sig.rstrip())):
+        kind = match.lastgroup
+        start, end = match.span(kind)
+        append(new_token(Token, (kind, sig[start:end], start, end)))
+    tokens.append(Token(EOF, '', len(sig), len(sig)))
+    return tokens
+
+
+class Parser(object):  # pylint: disable=too-many-public-methods
+    """ Recursive descent parser over the tokens of a single signature """
+
+    def __init__(self, kind, sig):
+        self.kind = kind
+        self.sig = sig
+        self.tokens = tokenize(sig)
+        self.index = 0
+
+    def error(self, reason, token=None):
+        if token is None:
+            token = self.peek()
+        raise SignatureError(self.kind, self.sig, reason, token.start)
+
+    def peek(self):
+        return self.tokens[self.index]
+
+    def next(self):
+        token = self.tokens[self.index]
+        if token.kind != EOF:
+            self.index += 1
+        return token
+
+    def at(self, text):
+        # Only the end of the signature has an empty text
+        return self.tokens[self.index].text == text
+
+    def accept(self, text):
+        if self.tokens[self.index].text == text:
+            self.index += 1
+            return True
+        return False
+
+    def expect(self, text):
+        if not self.accept(text):
+            self.error('expected %r' % text)
+
+    def expect_end(self):
+        if self.peek().kind != EOF:
+            self.error('unexpected %r' % self.peek().text)
+
+    def expect_name(self):
+        token = self.peek()
+        if token.kind != 'name':
+            self.error('expected a name')
+        self.index += 1
+        return token.text
+
+    def parse_modifiers(self, allowed):
+        modifiers = []
+        while self.peek().kind == 'name' and self.peek().text in allowed:
+            modifiers.append(self.next().text)
+        return tuple(modifiers)
+
+    def parse_type(self, depth=0):
+        """ type := ('global' '::')? name generic_args? suffix*
+                  | tuple suffix*
+
+            The global alias qualifier is dropped from the name, as the
+            names of types are always looked up from the global
+            namespace. """
+        if depth > MAX_NESTING:
+            self.error('type nested too deeply')
+        name = None
+        generic_args = ()
+        tuple_elements = ()
+        if self.accept('('):
+            tuple_elements = self.parse_tuple_elements(depth)
+        else:
+            name = self.expect_name()
+            if name == 'global' and self.at(':') and \
+               self.tokens[self.index + 1].text == ':':
+                self.index += 2
+                name = self.expect_name()
+            if self.accept('<'):
+                args = [self.parse_type(depth + 1)]
+                while self.accept(','):
+                    args.append(self.parse_type(depth + 1))
+                self.expect('>')
+                generic_args = tuple(args)
+        return TypeSig(name, generic_args, tuple_elements,
+                       self.parse_type_suffixes())
+
+    def parse_tuple_elements(self, depth):
+        """ tuple := '(' type name? (',' type name?)+ ')' """
+        elements = []
+        while True:
+            typ = self.parse_type(depth + 1)
+            name = None
+            if self.peek().kind == 'name':
+                name = self.next().text
+            elements.append(TupleElementSig(typ, name))
+            if not self.accept(','):
+                break
+        self.expect(')')
+        if len(elements) < 2:
+            self.error('tuple types need at least two elements')
+        return tuple(elements)
+
+    def parse_type_suffixes(self):
+        """ suffix := '?' | '*' | '[' ','* ']' """
+        suffixes = []
+        while True:
+            if self.accept('?'):
+                suffixes.append('?')
+            elif self.accept('*'):
+                suffixes.append('*')
+            elif self.accept('['):
+                rank = 1
+                while self.accept(','):
+                    rank += 1
+                self.expect(']')
+                suffixes.append('[' + ',' * (rank - 1) + ']')
+            else:
+                return tuple(suffixes)
+
+    def parse_default(self, close):
+        """ Consume the tokens of a default value, up to the next top level
+            comma or the closing bracket of the parameter list """
+        start = self.peek()
+        end = None
+        stack = []
+        depth = {'(': 0, '[': 0, '{': 0, '<': 0}
+        while True:
+            token = self.peek()
+            if token.kind == EOF:
+                break
+            if token.kind == 'op':
+                text = token.text
+                if text == ',' and not stack:
+                    break
+                if text in OPENING_BRACKETS:
+                    opening = OPENING_BRACKETS[text]
+                    if not depth[opening]:
+                        if text == close:
+                            break
+                        self.error('unbalanced %r' % text)
+                    # Discard any unclosed '<', which must have been a
+                    # less than operator
+                    while stack[-1] != opening:
+                        depth[stack.pop()] -= 1
+                    depth[stack.pop()] -= 1
+                elif text in depth:
+                    stack.append(text)
+                    depth[text] += 1
+                elif text == '>' and stack and stack[-1] == '<':
+                    depth[stack.pop()] -= 1
+            end = self.next()
+        if end is None:
+            self.error('expected a default value')
+        return self.sig[start.start:end.end]
+
+    def parse_param(self, close):
+        """ param := modifier* type name ('=' default)? """
+        modifiers = self.parse_modifiers(PARAM_MODIFIERS)
+        typ = self.parse_type()
+        name = self.expect_name()
+        default = None
+        if self.accept('='):
+            if self.at(',') or self.at(close):
+                self.error('expected a default value')
+            default = self.parse_default(close)
+        return ParamSig(name, typ, default, modifiers)
+
+    def parse_params(self, close):
+        params = []
+        if not self.at(close):
+            params.append(self.parse_param(close))
+            while self.accept(','):
+                params.append(self.parse_param(close))
+        self.expect(close)
+        return tuple(params)
+
+    def parse_param_types(self, close):
+        """ param_types := (modifier* type (',' modifier* type)*)? """
+        params = []
+        while not self.accept(close):
+            if params:
+                self.expect(',')
+            modifiers = self.parse_modifiers(PARAM_MODIFIERS)
+            params.append(ParamSig(None, self.parse_type(), None, modifiers))
+        return tuple(params)
+
+    def parse_accessors(self):
+        """ accessors := '{' (accessor_modifier* ('get'|'set') ';')* '}' """
+        self.expect('{')
+        getter = setter = False
+        while not self.accept('}'):
+            self.parse_modifiers(ACCESSOR_MODIFIERS)
+            if self.accept('get'):
+                getter = True
+            elif self.accept('set'):
+                setter = True
+            else:
+                self.error('expected get or set')
+            self.expect(';')
+        return getter, setter
+
+    def parse_generic_params(self, typ):
+        if typ.tuple_elements or typ.suffixes:
+            self.error('expected a name')
+        for arg in typ.generic_args:
+            if arg.generic_args or arg.tuple_elements or arg.suffixes or \
+               '.' in arg.name:
+                self.error('invalid generic parameter %s' % arg.name)
+        return tuple(arg.name for arg in typ.generic_args)
+
+    def parse_method(self):
+        """ method := modifier* type? name generic_params? '(' params ')'
+                    | modifier* ('implicit' | 'explicit') 'operator' type
+                      '(' params ')' """
+        modifiers = self.parse_modifiers(MEMBER_MODIFIERS)
+        if self.peek().text in CONVERSION_KINDS and \
+           self.tokens[self.index + 1].text == 'operator':
+            # A conversion operator, named by the type converted to
+            kind = self.next().text
+            self.next()
+            name = '%s operator %s' % (kind, self.parse_type())
+            self.expect('(')
+            params = self.parse_params(')')
+            self.expect_end()
+            return MethodSig(modifiers, None, name, (), params)
+        typ = self.parse_type()
+        if self.at('('):
+            name_typ = typ
+            typ = None
+        elif self.at('operator'):
+            self.next()
+            operator = []
+            while not self.at('(') and self.peek().kind == 'op':
+                operator.append(self.next().text)
+            if not operator:
+                self.error('expected an operator')
+            name_typ = TypeSig('operator ' + ''.join(operator), (), (), ())
+        else:
+            name_typ = self.parse_type()
+        generic_params = self.parse_generic_params(name_typ)
+        self.expect('(')
+        params = self.parse_params(')')
+        self.expect_end()
+        return MethodSig(modifiers, typ, name_typ.name, generic_params,
+                         params)
+
+    def parse_property(self):
+        """ property := modifier* type? name accessors """
+        modifiers = self.parse_modifiers(MEMBER_MODIFIERS)
+        typ = self.parse_type()
+        if self.at('{'):
+            if typ.generic_args or typ.tuple_elements or typ.suffixes:
+                self.error('expected a name')
+            name = typ.name
+            typ = None
+        else:
+            name = self.expect_name()
+        getter, setter = self.parse_accessors()
+        self.expect_end()
+        return PropertySig(modifiers, typ, name, getter, setter)
+
+    def at_indexer_name(self):
+        token = self.peek()
+        return token.kind == 'name' and \
+            (token.text == 'this' or token.text.endswith('.this')) and \
+            self.tokens[self.index + 1].text == '['
+
+    def parse_indexer(self):
+        """ indexer := modifier* type? 'this' '[' params ']' accessors """
+        modifiers = self.parse_modifiers(MEMBER_MODIFIERS)
+        typ = None
+        if not self.at_indexer_name():
+            typ = self.parse_type()
+        name = self.expect_name()
+        if name != 'this' and not name.endswith('.this'):
+            self.error('expected this')
+        self.expect('[')
+        params = self.parse_params(']')
+        if not params:
+            self.error('indexers need at least one parameter')
+        getter, setter = self.parse_accessors()
+        self.expect_end()
+        return IndexerSig(modifiers, typ, params, getter, setter)
+
+    def parse_reference(self):
+        """ reference := name generic_params? ('(' param_types ')')?
+                       | name '[' param_types ']' """
+        if self.at_indexer_name():
+            name = self.next().text + '[]'
+            self.expect('[')
+            params = self.parse_param_types(']') or None
+        else:
+            typ = self.parse_type()
+            self.parse_generic_params(typ)
+            name = typ.name
+            params = None
+            if self.accept('('):
+                params = self.parse_param_types(')')
+        self.expect_end()
+        return ReferenceSig(name, params)
+
+    def parse_attr(self):
+        """ attribute := name ('(' params ')')? """
+        name = self.expect_name()
+        params = ()
+        if self.accept('('):
+            params = self.parse_params(')')
+        self.expect_end()
+        return AttrSig(name, params)
+
+
+def parse_method(sig):
+    """ Parse a method signature of the form: modifier* type name (params) """
+    return Parser('Method', sig).parse_method()
+
+
+def parse_property(sig):
+    """ Parse a property signature of the form:
+        modifier* type? name { (get;)? (set;)? } """
+    return Parser('Property', sig).parse_property()
+
+
+def parse_indexer(sig):
+    """ Parse a indexer signature of the form:
+        modifier* type? this[params] { (get;)? (set;)? } """
+    return Parser('Indexer', sig).parse_indexer()
+
+
+def parse_param(sig):
+    """ Parse a parameter signature of the form: type name (= default)? """
+    parser = Parser('Parameter', sig)
+    param = parser.parse_param(None)
+    parser.expect_end()
+    return param
+
+
+def parse_type(sig):
+    """ Parse a type signature """
+    parser = Parser('Type', sig)
+    typ = parser.parse_type()
+    parser.expect_end()
+    return typ
+
+
+def parse_attr(sig):
+    """ Parse an attribute signature """
+    return Parser('Attribute', sig).parse_attr()
+
+
+def parse_reference(sig):
+    """ Parse the target of a reference, which may select an overload by
+        its parameter types, e.g. Method(int, string) or this[int]. The
+        parameters are None if no overload is selected. """
+    return Parser('Reference', sig).parse_reference()
@@ -0,0 +1,181 @@
+""" Resolution of references to C# objects """
+
+from docutils import nodes
+from sphinx import addnodes
+try:
+    from sphinx.errors import NoUri
+except ImportError:
+    from sphinx.environment import NoUri
+from sphinx.transforms import SphinxTransform
+from sphinx.util.nodes import make_refnode
+from sphinx_csharp import links
+from sphinx_csharp.signatures import MSDN_VALUE_TYPES, shorten_type, \
+    split_reference
+from sphinx_csharp.stats import PROFILER
+
+
+def get_msdn_url(name, arity=None):
+    """ Try and find the URL of a type on MSDN, or in one of the link
+        indexes. Returns the full name of the type and its URL, or None """
+    name = MSDN_VALUE_TYPES.get(name, name)
+    url = links.find_url(name, arity)
+    if url is None and name.startswith('System.'):
+        # Not in the index, so guess
+        url = links.DOTNET_API_URL + name.lower()
+        if arity:
+            url += '-%d' % arity
+    if url is None:
+        return None
+    return name, url
+
+
+def make_external_ref(name, url):
+    """ Create a reference to a type documented elsewhere """
+    node = nodes.reference(name, shorten_type(name))
+    node['refuri'] = url
+    node['reftitle'] = name
+    return node
+
+
+def make_inventory_ref(project, version, uri, contnode):
+    """ Create a reference to an object in an intersphinx inventory """
+    node = nodes.reference('', '', internal=False, refuri=uri,
+                           reftitle='(in %s v%s)' % (project, version))
+    node += contnode
+    return node
+
+
+def make_xref_node(found, fromdocname, builder, contnode):
+    """ Create the node for a reference to a target found by
+        CSharpDomain.find_xref_target """
+    if found[0] == 'external':
+        return make_external_ref(*found[1:])
+    if found[0] == 'inventory':
+        return make_inventory_ref(*(found[2:] + (contnode,)))
+    _, docname, anchor, title = found
+    return make_refnode(builder, fromdocname, docname, anchor, contnode,
+                        title)
+
+
+def resolve_outcome(found):
+    """ The name the resolving of a reference to a target found by
+        CSharpDomain.find_xref_target is profiled as """
+    return 'resolve.' + ('local' if found[0] == 'internal' else found[0])
+
+
+def get_msdn_ref(name, arity=None):
+    """ Try and create a reference to a type on MSDN """
+    msdn = get_msdn_url(name, arity)
+    if msdn is None:
+        return None
+    return make_external_ref(*msdn)
+
+
+def qualify_name(target, scope, depth):
+    """ Qualify target with the first depth parts of scope """
+    if not depth:
+        return target
+    return '.'.join(scope.split('.')[:depth] + [target])
+
+
+def scope_targets(target, scope):
+    """ Generate the fully qualified names that target could refer to from
+        within scope, in the order they are looked up """
+    yield target
+    if scope is not None:
+        parts = scope.split('.')
+        while parts:
+            yield '.'.join(parts)+'.'+target
+            parts = parts[:-1]
+
+
+def reference_name(target):
+    """ The name used to find the documents that may refer to an object,
+        which is the last part of its name, e.g. Method for
+        Namespace.Class.Method. References to objects with the same last
+        part can resolve to it, depending on their scope. """
+    name = target.split('(', 1)[0].split('<', 1)[0].split('[', 1)[0]
+    return name.rsplit('.', 1)[-1]
+
+
+def could_refer_to(target, scope, fullname):
+    """ Whether a reference to target from within scope could resolve to an
+        object with the given full name, if there were no other objects """
+    target = split_reference(target)[0]
+    if fullname == target:
+        return True
+    if scope is None or not fullname.endswith('.' + target):
+        return False
+    prefix = fullname[:-len(target)-1]
+    return scope == prefix or scope.startswith(prefix + '.')
+
+
+class ResolveReferences(SphinxTransform):
+    """ Resolve the C# references in a document in bulk, before Sphinx
+        resolves the remaining references one at a time. The references
+        are grouped by scope and role, each distinct target in a group is
+        looked up once, and the references are then replaced in one pass
+        over the children of each parent node. References that are not
+        found are left for Sphinx, so that they are warned about and
+        passed to the missing-reference event. """
+    default_priority = 8
+
+    def apply(self, **kwargs):
+        with PROFILER.timer('resolve_batch'):
+            for parent, children in self.resolve_refs().items():
+                for newnode in children.values():
+                    parent.setup_child(newnode)
+                parent.children = [children.get(id(child), child)
+                                   for child in parent.children]
+
+    def resolve_refs(self):
+        """ Resolve the references that can be found, returning the new
+            nodes as a dict of parent node to a dict of the id of each
+            pending reference to the node replacing it """
+        domain = self.env.get_domain('csharp')
+        replacements = {}
+        for (scope, typ), targets in self.group_refs().items():
+            for (target, arity), refs in targets.items():
+                # The references left for Sphinx are recorded when it
+                # resolves them
+                with PROFILER.timer('resolve') as timer:
+                    found = domain.get_xref_target(typ, target, scope, arity)
+                    if found is None:
+                        timer.calls = 0
+                        continue
+                    timer.name = resolve_outcome(found)
+                    timer.calls = self.replace_refs(found, refs,
+                                                    replacements)
+        return replacements
+
+    def replace_refs(self, found, refs, replacements):
+        """ Add the nodes replacing the references to a target that was
+            found to replacements, returning how many were replaced """
+        replaced = 0
+        for node in refs:
+            try:
+                newnode = make_xref_node(
+                    found, node.get('refdoc', self.env.docname),
+                    self.app.builder, node[0])
+            except NoUri:
+                # Left for Sphinx, which falls back to the content of the
+                # reference
+                continue
+            newnode.update_basic_atts(node)
+            replacements.setdefault(node.parent, {})[id(node)] = newnode
+            replaced += 1
+        return replaced
+
+    def group_refs(self):
+        """ Group the pending C# references in the document by scope and
+            role, then by target and generic arity """
+        findall = getattr(self.document, 'findall', self.document.traverse)
+        groups = {}
+        for node in findall(addnodes.pending_xref):
+            if node.get('refdomain') != 'csharp':
+                continue
+            targets = groups.setdefault(
+                (node.get('csharp:parent'), node['reftype']), {})
+            targets.setdefault((node['reftarget'], node.get('csharp:arity')),
+                               []).append(node)
+        return groups
@@ -0,0 +1,243 @@
+""" Search index entries of the documented C# objects
+
+Sphinx's search page rebuilds the anchor of an object from its display
+name, which leaves out the namespace of C# objects. The C# entries in the
+search index are therefore rewritten at the end of the build, with the
+number of their namespace after the name. csharp_search.js uses it to
+rebuild their anchors.
+
+With the csharp_search_shards config value, the entries of the members of
+the types in each namespace are moved out of searchindex.js into a shard
+file for the namespace. The search index keeps the names found in each
+shard, and csharp_search.js loads the shards containing the words of a
+query before searching for them.
+"""
+
+import io
+import json
+import os
+import shutil
+
+try:
+    from html import escape
+except ImportError:
+    from xml.sax.saxutils import escape
+
+from sphinx.search import js_index
+from sphinx_csharp.export import replace_file
+from sphinx_csharp.stats import PROFILER
+
+#: Rebuilds the anchors of C# objects in search results, and loads the
+#: search index shards when csharp_search_shards is set
+SEARCH_SCRIPT = 'csharp_search.js'
+
+#: The directory of the shard files, in the output directory
+SHARD_DIR = 'csharp_search'
+
+#: The key of the C# search data in the search index
+INDEX_KEY = 'csharp'
+
+
+def load_index(path):
+    with io.open(path, encoding='utf-8') as index_file:
+        return js_index.loads(index_file.read())
+
+
+def dump_index(path, index):
+    with io.open(path + '.tmp', 'w', encoding='utf-8') as index_file:
+        index_file.write(js_index.dumps(index))
+    replace_file(path + '.tmp', path)
+
+
+def short_anchor(anchor, typ, fullname):
+    """ The anchor as stored in the search index, from which the search
+        page rebuilds it using the given name """
+    if anchor == fullname:
+        return ''
+    if anchor == typ + '-' + fullname:
+        return '-'
+    return anchor
+
+
+def remove_entries(objects, typeindexes):
+    """ Remove the entries of the given object types from the objects of a
+        search index, in either of the layouts used by Sphinx """
+    for prefix in list(objects):
+        entries = objects[prefix]
+        if isinstance(entries, dict):
+            entries = dict((name, entry) for name, entry in entries.items()
+                           if entry[1] not in typeindexes)
+        else:
+            entries = [entry for entry in entries
+                       if entry[1] not in typeindexes]
+        if entries:
+            objects[prefix] = entries
+        else:
+            del objects[prefix]
+
+
+def add_entry(objects, prefix, name, entry, as_dict):
+    if as_dict:
+        objects.setdefault(prefix, {})[name] = entry
+    else:
+        entry.insert(4, name)
+        objects.setdefault(prefix, []).append(entry)
+
+
+def get_type_indexes(index):
+    """ The index of each C# object type in a search index """
+    typeindexes = {}
+    for key, objtype in index['objtypes'].items():
+        domain, _, typ = objtype.partition(':')
+        if domain == 'csharp':
+            typeindexes[typ] = int(key)
+    return typeindexes
+
+
+def make_entry(fullname, dispname, typ, anchor, entry, namespaces):
+    """ Complete the search index entry of an object with its anchor and the
+        number of its namespace, numbered in the given dict. Returns the
+        number, which is None for the global namespace. """
+    namespace = escape(fullname[:len(fullname) - len(dispname) - 1])
+    dispname = escape(dispname)
+    if not namespace:
+        entry.append(short_anchor(anchor, typ, dispname))
+        return None
+    number = namespaces.setdefault(namespace, len(namespaces))
+    entry += [short_anchor(anchor, typ, namespace + '.' + dispname), number]
+    return number
+
+
+def iter_entries(index, domain_objects, namespaces):
+    """ Generate the object type, namespace number, prefix, name and entry
+        of each object returned by the domain's get_objects that is in the
+        search index """
+    typeindexes = get_type_indexes(index)
+    fn2index = dict((docname, i) for i, docname
+                    in enumerate(index['docnames']))
+    for fullname, dispname, typ, docname, anchor, priority in \
+            sorted(domain_objects):
+        # Sphinx registered the type of each object it indexed
+        if priority < 0 or docname not in fn2index or typ not in typeindexes:
+            continue
+        entry = [fn2index[docname], typeindexes[typ], priority]
+        number = make_entry(fullname, dispname, typ, anchor, entry,
+                            namespaces)
+        prefix, _, name = escape(dispname).rpartition('.')
+        yield typ, number, prefix, name, entry
+
+
+def rewrite_index(index, domain_objects, shard_types=None):
+    """ Rewrite the C# entries of a search index, from the objects returned
+        by the domain's get_objects. The entries of objects whose type is in
+        shard_types are returned, grouped by the number of their namespace,
+        instead of being added to the index. """
+    objects = index['objects']
+    # Sphinx 1.x and 2.x keep the entries of a prefix in a dict by name
+    as_dict = any(isinstance(entries, dict) for entries in objects.values())
+    remove_entries(objects, set(get_type_indexes(index).values()))
+    namespaces = {}
+    shards = {}
+    for typ, number, prefix, name, entry in iter_entries(
+            index, domain_objects, namespaces):
+        # Members of types in the global namespace are not sharded
+        if number is not None and shard_types is not None and \
+                typ in shard_types:
+            add_entry(shards.setdefault(number, {}), prefix, name, entry,
+                      as_dict)
+        else:
+            add_entry(objects, prefix, name, entry, as_dict)
+    index[INDEX_KEY] = {
+        'namespaces': sorted(namespaces, key=namespaces.get),
+    }
+    return shards
+
+
+def shard_names(shard):
+    """ The lower case parts of the names in a shard """
+    names = set()
+    for prefix, entries in shard.items():
+        names.update(prefix.lower().split('.'))
+        if isinstance(entries, dict):
+            names.update(name.lower() for name in entries)
+        else:
+            names.update(entry[4].lower() for entry in entries)
+    names.discard('')
+    return names
+
+
+def write_shards(outdir, index, shards):
+    """ Write each shard to its own file, named by the number of its
+        namespace, and record the shards containing each name in the
+        index """
+    directory = os.path.join(outdir, SHARD_DIR)
+    remove_shards(outdir)
+    os.makedirs(directory)
+    names = {}
+    for number, shard in sorted(shards.items()):
+        path = os.path.join(directory, '%d.js' % number)
+        with io.open(path, 'w', encoding='utf-8') as shard_file:
+            shard_file.write(u'CSharpSearch.addShard(%d,%s)' % (
+                number, json.dumps(shard, separators=(',', ':'),
+                                   sort_keys=True)))
+        for name in shard_names(shard):
+            names.setdefault(name, []).append(number)
+    index[INDEX_KEY]['names'] = names
+
+
+def remove_shards(outdir):
+    directory = os.path.join(outdir, SHARD_DIR)
+    if os.path.isdir(directory):
+        for filename in os.listdir(directory):
+            os.remove(os.path.join(directory, filename))
+        os.rmdir(directory)
+
+
+def update_index(path, outdir, domain_objects, shard_types=None):
+    """ Rewrite the C# entries of the search index at path, unless it was
+        already rewritten in the same mode, and write or remove the shards.
+        Returns whether the index was rewritten. """
+    index = load_index(path)
+    mode = 'shards' if shard_types else 'full'
+    if index.get(INDEX_KEY, {}).get('mode') == mode:
+        return False
+    shards = rewrite_index(index, domain_objects, shard_types)
+    index[INDEX_KEY]['mode'] = mode
+    if shard_types:
+        write_shards(outdir, index, shards)
+    else:
+        remove_shards(outdir)
+    dump_index(path, index)
+    return True
+
+
+def copy_search_script(app):
+    # Copied rather than added to html_static_path, which is the user's
+    # config and is compared with that of the previous build. It is copied
+    # before the pages are written, as Sphinx may link to the copy with its
+    # checksum.
+    if app.builder.format != 'html':
+        return
+    directory = os.path.join(app.outdir, '_static')
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    shutil.copyfile(
+        os.path.join(os.path.dirname(__file__), 'static', SEARCH_SCRIPT),
+        os.path.join(directory, SEARCH_SCRIPT))
+
+
+def write_search_index(app, exception):
+    builder = app.builder
+    if exception is not None or getattr(builder, 'indexer', None) is None or \
+            builder.indexer_format is not js_index:
+        return
+    path = os.path.join(app.outdir, builder.searchindex_filename)
+    if not os.path.isfile(path):
+        return
+    domain = app.env.get_domain('csharp')
+    shard_types = None
+    if app.config.csharp_search_shards:
+        shard_types = set(typ for typ, priority
+                          in domain.search_priorities.items() if priority > 0)
+    with PROFILER.timer('search_index'):
+        update_index(path, app.outdir, domain.get_objects(), shard_types)
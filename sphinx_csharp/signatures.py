@@ -0,0 +1,211 @@
+""" Parsing and formatting of the signatures of C# objects """
+
+import functools
+import hashlib
+from sphinx_csharp import parser
+from sphinx_csharp.cache import DiskCache, LRUCache
+from sphinx_csharp.stats import PROFILER, STATS
+
+#: Parsed signatures, keyed on the parse function and signature string.
+#: The parsed signatures are immutable, so can be shared by all directives.
+SIGNATURE_CACHE = LRUCache(4096)
+
+#: Parsed signatures stored on disk, to share them between builds, when the
+#: csharp_signature_cache_dir config value is set. The entries are stored as
+#: JSON, so depend on the version of the parser but not of Python.
+SIGNATURE_DISK_CACHE = DiskCache('json.%d' % parser.VERSION, parser.encode,
+                                 parser.decode)
+
+
+def cached_signature(func):
+    """ Cache the results of a signature parse function in SIGNATURE_CACHE """
+    profile_name = 'parse.' + func.__name__.split('_')[1]
+
+    @functools.wraps(func)
+    def wrapper(sig):
+        key = (func.__name__, sig)
+        result = SIGNATURE_CACHE.get(key)
+        if result is None:
+            STATS.add('signature_cache_misses')
+            result = SIGNATURE_DISK_CACHE.get(key)
+            if result is not None:
+                STATS.add('signature_disk_cache_hits')
+            else:
+                if SIGNATURE_DISK_CACHE.enabled:
+                    STATS.add('signature_disk_cache_misses')
+                with PROFILER.timer(profile_name):
+                    result = func(sig)
+                SIGNATURE_DISK_CACHE.put(key, result)
+            SIGNATURE_CACHE.put(key, result)
+        else:
+            STATS.add('signature_cache_hits')
+        return result
+    return wrapper
+
+
+@cached_signature
+def parse_method_signature(sig):
+    """ Parse a method signature of the form: modifier* type name (params) """
+    return parser.parse_method(sig)
+
+
+@cached_signature
+def parse_property_signature(sig):
+    """ Parse a property signature of the form:
+        modifier* type? name { (get;)? (set;)? } """
+    return parser.parse_property(sig)
+
+
+@cached_signature
+def parse_indexer_signature(sig):
+    """ Parse a indexer signature of the form:
+        modifier* type? this[params] { (get;)? (set;)? } """
+    return parser.parse_indexer(sig)
+
+
+@cached_signature
+def parse_param_signature(sig):
+    """ Parse a parameter signature of the form: type name (= default)? """
+    return parser.parse_param(sig)
+
+
+@cached_signature
+def parse_type_signature(sig):
+    """ Parse a type signature """
+    return parser.parse_type(sig)
+
+
+@cached_signature
+def parse_attr_signature(sig):
+    """ Parse an attribute signature """
+    return parser.parse_attr(sig)
+
+
+@cached_signature
+def parse_reference_signature(sig):
+    """ Parse the target of a reference, e.g. Method(int, string) """
+    return parser.parse_reference(sig)
+
+
+#: The parsers of the signatures of each object type, for the symbol export.
+#: The signatures of other object types are the names of the objects.
+EXPORT_PARSERS = {
+    'class': parse_type_signature,
+    'inherits': parse_type_signature,
+    'method': parse_method_signature,
+    'property': parse_property_signature,
+    'indexer': parse_indexer_signature,
+    'attribute': parse_attr_signature,
+}
+
+MSDN_VALUE_TYPES = {
+    'bool': 'System.Boolean',
+    'byte': 'System.Byte',
+    'char': 'System.Char',
+    'decimal': 'System.Decimal',
+    'double': 'System.Double',
+    'float': 'System.Single',
+    'int': 'System.Int32',
+    'long': 'System.Int64',
+    'object': 'System.Object',
+    'sbyte': 'System.SByte',
+    'short': 'System.Int16',
+    'string': 'System.String',
+    'uint': 'System.UInt32',
+    'ulong': 'System.UInt64',
+    'ushort': 'System.UInt16'
+}
+
+
+def canonical_type(typ):
+    """ The canonical form of a type, with aliases of value types replaced
+        by their full names and tuple element names dropped """
+    if typ.tuple_elements:
+        result = '(' + ','.join(canonical_type(elem.typ)
+                                for elem in typ.tuple_elements) + ')'
+    else:
+        result = MSDN_VALUE_TYPES.get(typ.name, typ.name)
+        if typ.generic_args:
+            result += '<' + ','.join(canonical_type(arg)
+                                     for arg in typ.generic_args) + '>'
+    return result + ''.join(typ.suffixes)
+
+
+def signature_id(params):
+    """ Identify an overload by its parameter types. Parameters passed by
+        reference are marked, as they cannot be overloaded on ref, out or
+        in alone. """
+    types = []
+    for param in params:
+        typ = canonical_type(param.typ)
+        if set(param.modifiers) & set(['ref', 'out', 'in']):
+            typ = 'ref ' + typ
+        types.append(typ)
+    return hashlib.sha1(','.join(types).encode('utf-8')).hexdigest()[:8]
+
+
+def split_reference(target):
+    """ Split a reference target into the name it refers to and the
+        signature id of the overload it selects, or None if it doesn't
+        select one. Targets that cannot be parsed are left as they are. """
+    if '(' not in target and '[' not in target:
+        return target, None
+    try:
+        name, params = parse_reference_signature(target)
+    except parser.SignatureError:
+        return target, None
+    if params is None:
+        return name, None
+    return name, signature_id(params)
+
+
+SHORTEN_TYPE_PREFIXES = [
+    'System.',
+    'System.Collections.Generic.'
+]
+
+
+def shorten_type(typ):
+    """ Shorten a type. E.g. drops 'System.' """
+    offset = 0
+    for prefix in SHORTEN_TYPE_PREFIXES:
+        if typ.startswith(prefix):
+            if len(prefix) > offset:
+                offset = len(prefix)
+    return typ[offset:]
+
+
+def format_type(typ, names=None):
+    """ The text of a type in a signature, with the next of the given names
+        in place of each named type, if given """
+    if typ.tuple_elements:
+        text = '(' + ', '.join(
+            format_type(elem.typ, names) +
+            ('' if elem.name is None else ' ' + elem.name)
+            for elem in typ.tuple_elements) + ')'
+    else:
+        text = shorten_type(typ.name) if names is None else next(names)
+    if typ.generic_args:
+        text += '<' + ', '.join(format_type(typ_param, names)
+                                for typ_param in typ.generic_args) + '>'
+    return text + ''.join(typ.suffixes)
+
+
+def get_type_names(typ, names=None):
+    """ Get the names of the types referred to by a type, including in its
+        generic arguments, with their generic arity """
+    if names is None:
+        names = []
+    if typ.tuple_elements:
+        for elem in typ.tuple_elements:
+            get_type_names(elem.typ, names)
+    else:
+        names.append((typ.name, len(typ.generic_args)))
+    for typ_param in typ.generic_args:
+        get_type_names(typ_param, names)
+    return names
+
+
+def evict_signatures(_, exception):
+    if exception is None:
+        SIGNATURE_DISK_CACHE.evict()
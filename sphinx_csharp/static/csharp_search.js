@@ -0,0 +1,137 @@
+/*
+ * Rebuilds the anchors of C# objects in the search index, whose display
+ * names leave out their namespace. Each of their entries ends with the
+ * number of its namespace.
+ *
+ * When the csharp_search_shards config value is set, the members of the
+ * types in each namespace are in a shard of the search index. Before a
+ * query is searched, the shards containing its words are loaded and their
+ * objects added to the search index.
+ */
+var CSharpSearch = {
+  expanded: false,
+  loaded: {},
+  pending: {},
+
+  /* Rebuild the anchors of the entries followed by a namespace number */
+  expand: function(objects) {
+    var namespaces = Search._index.csharp.namespaces;
+    var objnames = Search._index.objnames;
+    var anchor = function(entry, prefix, name) {
+      var fullname = namespaces[entry.pop()] + '.' +
+        (prefix ? prefix + '.' + name : name);
+      if (entry[3] === '')
+        entry[3] = fullname;
+      else if (entry[3] === '-')
+        entry[3] = objnames[entry[1]][1] + '-' + fullname;
+    };
+    Object.keys(objects).forEach(function(prefix) {
+      var entries = objects[prefix];
+      if (Array.isArray(entries)) {
+        entries.forEach(function(entry) {
+          if (entry.length > 5)
+            anchor(entry, prefix, entry[4]);
+        });
+      } else {
+        Object.keys(entries).forEach(function(name) {
+          if (entries[name].length > 4)
+            anchor(entries[name], prefix, name);
+        });
+      }
+    });
+  },
+
+  /* The shards with a name containing one of the words of a query */
+  findShards: function(query) {
+    var names = Search._index.csharp.names || {};
+    var words = query.toLowerCase().split(/[^\w\u00c0-\uffff]+/);
+    var shards = {};
+    words.forEach(function(word) {
+      if (!word)
+        return;
+      Object.keys(names).forEach(function(name) {
+        if (name.indexOf(word) > -1) {
+          names[name].forEach(function(shard) {
+            shards[shard] = true;
+          });
+        }
+      });
+    });
+    return Object.keys(shards).filter(function(shard) {
+      return !CSharpSearch.loaded[shard];
+    });
+  },
+
+  /* Called by each shard file, with the objects in the shard */
+  addShard: function(number, objects) {
+    var index = Search._index.objects;
+    CSharpSearch.expand(objects);
+    Object.keys(objects).forEach(function(prefix) {
+      var entries = objects[prefix];
+      if (Array.isArray(entries)) {
+        index[prefix] = (index[prefix] || []).concat(entries);
+      } else {
+        index[prefix] = index[prefix] || {};
+        Object.keys(entries).forEach(function(name) {
+          index[prefix][name] = entries[name];
+        });
+      }
+    });
+    CSharpSearch.loaded[number] = true;
+    CSharpSearch.done(number);
+  },
+
+  load: function(number, callback) {
+    if (CSharpSearch.pending[number]) {
+      CSharpSearch.pending[number].push(callback);
+      return;
+    }
+    CSharpSearch.pending[number] = [callback];
+    var index = document.querySelector('script[src$="searchindex.js"]');
+    var script = document.createElement('script');
+    script.src = index.src.replace(/searchindex\.js$/,
+                                   'csharp_search/' + number + '.js');
+    script.onerror = function() { CSharpSearch.done(number); };
+    document.body.appendChild(script);
+  },
+
+  done: function(number) {
+    var callbacks = CSharpSearch.pending[number] || [];
+    delete CSharpSearch.pending[number];
+    callbacks.forEach(function(callback) { callback(); });
+  },
+
+  /* Replace Search.query with one that rebuilds the anchors in the search
+   * index, and loads the shards the query needs, first */
+  install: function() {
+    if (typeof Search === 'undefined' || Search.csharpQuery)
+      return;
+    Search.csharpQuery = Search.query;
+    Search.query = function(query) {
+      if (!Search._index.csharp) {
+        Search.csharpQuery(query);
+        return;
+      }
+      if (!CSharpSearch.expanded) {
+        CSharpSearch.expand(Search._index.objects);
+        CSharpSearch.expanded = true;
+      }
+      var shards = CSharpSearch.findShards(query);
+      var remaining = shards.length;
+      if (!remaining) {
+        Search.csharpQuery(query);
+        return;
+      }
+      shards.forEach(function(shard) {
+        CSharpSearch.load(shard, function() {
+          remaining -= 1;
+          if (!remaining)
+            Search.csharpQuery(query);
+        });
+      });
+    };
+  }
+};
+
+CSharpSearch.install();
+document.addEventListener('DOMContentLoaded', CSharpSearch.install);
@@ -0,0 +1,164 @@
+""" Build statistics for the C# domain """
+
+import functools
+import io
+import json
+import os
+from timeit import default_timer
+from sphinx.util import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Counters(object):
+    """ Named counters for the current process.
+
+        Parallel builds fork worker processes, which inherit the counts made
+        so far by the main process. The counters are therefore cleared the
+        first time they are used in a new process, so that the counts
+        returned by snapshot() in a worker can be merged back into the main
+        process without counting anything twice. """
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.counts = {}
+
+    def _check_process(self):
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.counts = {}
+
+    def add(self, name, value=1):
+        self._check_process()
+        self.counts[name] = self.counts.get(name, 0) + value
+
+    def get(self, name):
+        self._check_process()
+        return self.counts.get(name, 0)
+
+    def snapshot(self):
+        """ Return a copy of the counts made by this process """
+        self._check_process()
+        return dict(self.counts)
+
+    def merge(self, counts):
+        """ Add counts made by another process """
+        for name, value in counts.items():
+            self.add(name, value)
+
+    def reset(self):
+        self.pid = os.getpid()
+        self.counts = {}
+
+
+class Timer(object):
+    """ Context manager that adds one call and its wall time to a pair of
+        counters. The name can be changed before the timer exits, e.g. to
+        record the outcome of the operation, and so can the number of
+        calls, e.g. for an operation done for a batch of items at once.
+        Nothing is recorded if there are no calls. """
+
+    def __init__(self, counters, name):
+        self.counters = counters
+        self.name = name
+        self.calls = 1
+        self.start = None
+
+    def __enter__(self):
+        self.start = default_timer()
+        return self
+
+    def __exit__(self, *_):
+        elapsed = default_timer() - self.start
+        if self.calls:
+            self.counters.add('profile.%s.calls' % self.name, self.calls)
+            self.counters.add('profile.%s.time' % self.name, elapsed)
+
+
+class NullTimer(object):
+    """ Timer that records nothing, used when profiling is disabled """
+
+    name = None
+    calls = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        pass
+
+
+NULL_TIMER = NullTimer()
+
+
+class Profiler(object):
+    """ Counts the calls and wall time of named operations, when enabled.
+        The counts are kept in Counters, so are merged from parallel
+        workers with the other statistics. """
+
+    def __init__(self, counters):
+        self.counters = counters
+        self.enabled = False
+
+    def timer(self, name):
+        if not self.enabled:
+            return NULL_TIMER
+        return Timer(self.counters, name)
+
+    def wrap(self, name, func):
+        """ Wrap a function so that its calls are timed """
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.timer(name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    def results(self):
+        """ Return a dict mapping each operation to its number of calls
+            and total time in seconds """
+        results = {}
+        for key, value in self.counters.snapshot().items():
+            if key.startswith('profile.'):
+                name, field = key[len('profile.'):].rsplit('.', 1)
+                results.setdefault(name, {'calls': 0, 'time': 0.0})
+                results[name][field] = value
+        return results
+
+
+#: Statistics for the current build, merged from parallel workers
+STATS = Counters()
+
+#: Profiling of the domain, enabled by the csharp_profile config value
+PROFILER = Profiler(STATS)
+
+
+def report_stats(_, exception):
+    if exception is not None:
+        return
+    for name, label in (('signature_cache', 'signature cache'),
+                        ('signature_disk_cache', 'signature disk cache'),
+                        ('xref_cache', 'cross-reference cache')):
+        hits = STATS.get(name + '_hits')
+        misses = STATS.get(name + '_misses')
+        if hits or misses:
+            logger.info('C# %s: %d hits, %d misses (%.1f%% hit rate)',
+                        label, hits, misses, 100.0 * hits / (hits + misses))
+
+
+def report_profile(app, exception):
+    if exception is not None or not PROFILER.enabled:
+        return
+    results = PROFILER.results()
+    rows = sorted(results.items(), key=lambda item: -item[1]['time'])
+    logger.info('C# domain profile:')
+    logger.info('  %-32s %10s %12s %12s',
+                'operation', 'calls', 'total (ms)', 'per call (us)')
+    for name, result in rows:
+        logger.info('  %-32s %10d %12.1f %12.1f', name, result['calls'],
+                    result['time'] * 1e3,
+                    result['time'] * 1e6 / max(result['calls'], 1))
+    path = os.path.join(app.outdir, 'csharp_profile.json')
+    with io.open(path, 'w', encoding='utf-8') as profile_file:
+        profile_file.write(json.dumps(results, indent=2, sort_keys=True) +
+                           u'\n')
+    logger.info('C# domain profile written to %s', path)
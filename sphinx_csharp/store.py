@@ -0,0 +1,460 @@
+""" Stores for the objects described by the C# domain
+
+Each object is identified by a (objtype, fullname, sigid) key, where the
+signature id tells apart the overloads of methods and indexers and is empty
+for other objects, and is stored with the name of the document describing
+it and whether it is hidden from the search index.
+
+TrieStore keeps the objects in the domain data, so they are pickled with
+the environment. SqliteStore keeps them in an SQLite database next to the
+environment, indexed by full name and document, so that very large sets of
+objects do not need to be held in memory.
+"""
+
+import itertools
+import os
+import sqlite3
+import uuid
+
+try:
+    from sys import intern
+except ImportError:
+    # Python 2's intern only accepts byte strings
+    INTERNED = {}
+
+    def intern(string):
+        """ Return the canonical instance of a string """
+        return INTERNED.setdefault(string, string)
+
+
+def iter_objects(scopes):
+    """ Generate the (objtype, fullname, sigid, docname) of each object in
+        a trie of scopes """
+    stack = [('', scopes)]
+    while stack:
+        prefix, node = stack.pop()
+        for part, child in node.items():
+            if part is None:
+                for objtype, overloads in child.items():
+                    for sigid, docname in overloads.items():
+                        yield objtype, prefix[1:], sigid, docname
+            else:
+                stack.append((prefix + '.' + part, child))
+
+
+def scope_depths(scope):
+    """ The depths of the scopes a name is looked up in from within scope:
+        the top level, then each enclosing scope from the innermost out """
+    depth = 0 if scope is None else len(scope.split('.'))
+    return [0] + list(range(depth, 0, -1))
+
+
+class TrieStore(object):
+    """ Objects stored in the domain data, in a trie of the parts of their
+        names """
+
+    def __init__(self, data, _=None):
+        # Each trie node is a dict of child nodes keyed by name part, and
+        # the objects with that name are stored under None, as a dict of
+        # object types to the documents of each overload, keyed by
+        # signature id. The strings are interned, so each name part and
+        # docname is only stored, and pickled, once.
+        self.scopes = data.setdefault('scopes', {})
+        self.hidden = data.setdefault('hidden', set())
+        # Indexes of the trie, rebuilt when the environment is loaded:
+        # (objtype, fullname) -> the overloads of the object in the trie,
+        # and docname -> set of keys
+        self.objects = {}
+        self.docs = {}
+        for key in iter_objects(self.scopes):
+            self.objects[key[:2]] = self._find_overloads(key[:2])
+            self.docs.setdefault(key[3], set()).add(key[:3])
+        # The trie nodes returned by _get_scope_nodes, cleared whenever
+        # objects are added or removed
+        self._scope_nodes = {}
+        self.lost = False
+
+    def _find_overloads(self, key):
+        node = self.scopes
+        for part in key[1].split('.'):
+            node = node[part]
+        return node[None][key[0]]
+
+    @staticmethod
+    def reset(data, _=None):
+        """ Remove all objects """
+        data['scopes'] = {}
+        data['hidden'] = set()
+
+    def get_docname(self, key):
+        return self.objects.get(key[:2], {}).get(key[2])
+
+    def get_location(self, key):
+        docname = self.get_docname(key)
+        return None if docname is None else (docname, key in self.hidden)
+
+    def get_overloads(self, objtype, fullname):
+        return self.objects.get((objtype, fullname), {})
+
+    def get_doc_keys(self, docname):
+        return list(self.docs.get(docname, ()))
+
+    def add(self, key, docname, hidden=False):
+        key = (intern(key[0]), intern(key[1]), intern(key[2]))
+        docname = intern(docname)
+        self.docs.setdefault(docname, set()).add(key)
+        self._scope_nodes.clear()
+        node = self.scopes
+        for part in key[1].split('.'):
+            node = node.setdefault(intern(part), {})
+        overloads = node.setdefault(None, {}).setdefault(key[0], {})
+        overloads[key[2]] = docname
+        self.objects[key[:2]] = overloads
+        if hidden:
+            self.hidden.add(key)
+
+    def remove(self, key):
+        objtype, fullname, sigid = key
+        overloads = self.objects[key[:2]]
+        location = (overloads.pop(sigid), key in self.hidden)
+        docname = location[0]
+        self.hidden.discard(key)
+        keys = self.docs[docname]
+        keys.discard(key)
+        if not keys:
+            del self.docs[docname]
+        self._scope_nodes.clear()
+        if overloads:
+            return location
+        del self.objects[key[:2]]
+        parts = fullname.split('.')
+        path = [self.scopes]
+        for part in parts:
+            path.append(path[-1][part])
+        objtypes = path[-1][None]
+        del objtypes[objtype]
+        if not objtypes:
+            del path[-1][None]
+        # Remove nodes left empty
+        for i in range(len(parts), 0, -1):
+            if path[i]:
+                break
+            del path[i-1][parts[i-1]]
+        return location
+
+    def find_names(self, target, scope):
+        """ Look up target as a fully qualified name, then in each scope
+            enclosing scope from the innermost outwards. Generates the
+            depth of the scope and the object types, for each scope in
+            which the name exists. """
+        parts = target.split('.')
+        for depth, node in self._get_scope_nodes(scope):
+            for part in parts:
+                node = node.get(part)
+                if node is None:
+                    break
+            else:
+                found = node.get(None)
+                if found:
+                    yield depth, found
+
+    def _get_scope_nodes(self, scope):
+        """ Get the trie nodes of the scopes to look up names in from within
+            scope, in lookup order, paired with their depth """
+        scope_nodes = self._scope_nodes.get(scope)
+        if scope_nodes is None:
+            node = self.scopes
+            scope_nodes = [(0, node)]
+            if scope is not None:
+                for depth, part in enumerate(scope.split('.')):
+                    node = node.get(part)
+                    if node is None:
+                        break
+                    scope_nodes.insert(1, (depth + 1, node))
+            self._scope_nodes[scope] = scope_nodes
+        return scope_nodes
+
+    def get_objtypes(self, fullname):
+        node = self.scopes
+        for part in fullname.split('.'):
+            node = node.get(part)
+            if node is None:
+                return ()
+        return node.get(None, ())
+
+    def iter_names(self):
+        """ Generate the (objtype, fullname, overloads, hidden sigids) of
+            each name """
+        for (objtype, fullname), overloads in self.objects.items():
+            yield objtype, fullname, overloads, self._hidden_sigids(
+                objtype, fullname, overloads)
+
+    def _hidden_sigids(self, objtype, fullname, overloads):
+        return set(sigid for sigid in overloads
+                   if (objtype, fullname, sigid) in self.hidden)
+
+    def get_children(self, parent):
+        """ Get the (objtype, fullname, overloads, hidden sigids) of each
+            name directly within parent """
+        node = self.scopes
+        for part in parent.split('.'):
+            node = node.get(part)
+            if node is None:
+                return []
+        children = []
+        for part, child in node.items():
+            if part is None:
+                continue
+            fullname = parent + '.' + part
+            for objtype, overloads in child.get(None, {}).items():
+                children.append((objtype, fullname, overloads,
+                                 self._hidden_sigids(objtype, fullname,
+                                                     overloads)))
+        return children
+
+    @staticmethod
+    def merged_objects(otherdata):
+        """ Generate the (key, docname, hidden) of the objects in the data
+            of a parallel worker """
+        for key in iter_objects(otherdata['scopes']):
+            yield key[:3], key[3], key[:3] in otherdata['hidden']
+
+    def commit(self):
+        pass
+
+    def check(self, thorough=False):
+        """ Check the indexes are consistent, returning a list of problems
+            found. Checking them in full walks the whole trie, so is only
+            done if thorough. Otherwise only their sizes are compared. """
+        if not thorough:
+            # Each name has at least one overload, and each overload and
+            # hidden object is in the document index
+            count = sum(len(keys) for keys in self.docs.values())
+            if count < len(self.objects) or count < len(self.hidden):
+                return ['indexes are out of sync']
+            return []
+        problems = []
+        docs = {}
+        for key in iter_objects(self.scopes):
+            docs.setdefault(key[3], set()).add(key[:3])
+        if docs != self.docs:
+            problems.append('document index is out of sync')
+        keys = set(key[:2] for keys in docs.values() for key in keys)
+        if keys != set(self.objects) or any(
+                self.objects[key] is not self._find_overloads(key)
+                for key in keys):
+            problems.append('scope index is out of sync')
+        if any(self.get_docname(key) is None for key in self.hidden):
+            problems.append('hidden objects are out of sync')
+        return problems
+
+
+def group_names(rows):
+    """ Group rows of (fullname, objtype, sigid, docname, hidden), ordered
+        by name, into the (objtype, fullname, overloads, hidden sigids) of
+        each name """
+    for (fullname, objtype), group in itertools.groupby(
+            rows, lambda row: row[:2]):
+        overloads = {}
+        hidden = set()
+        for _, _, sigid, docname, is_hidden in group:
+            overloads[sigid] = docname
+            if is_hidden:
+                hidden.add(sigid)
+        yield objtype, fullname, overloads, hidden
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS objects (
+    fullname TEXT NOT NULL,
+    objtype TEXT NOT NULL,
+    sigid TEXT NOT NULL,
+    docname TEXT NOT NULL,
+    hidden INTEGER NOT NULL,
+    PRIMARY KEY (fullname, objtype, sigid)
+);
+CREATE INDEX IF NOT EXISTS objects_docname ON objects (docname);
+CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT);
+'''
+
+
+class SqliteStore(object):
+    """ Objects stored in an SQLite database, identified in the domain data
+        by a random token so that a database that does not belong to the
+        environment is detected.
+
+        The database is written by the main process only. Parallel workers
+        read it with their own connections, in WAL mode so that they do not
+        block each other, and note the objects they add in a journal in
+        the domain data, which is merged by the main process. Only
+        get_docname and get_location see the objects a worker added. """
+
+    def __init__(self, data, path):
+        self.data = data
+        self.path = path
+        self.journal = data.setdefault('journal', [])
+        # The (docname, hidden) location of the objects added by a worker,
+        # or None for those removed
+        self._added = {}
+        self._owner = os.getpid()
+        # The connection of each process. A connection must not be used
+        # after a fork, so workers open their own. The parent's is kept
+        # open, as closing it could release the parent's locks.
+        self._connections = {}
+        token = data.get('sqlite_token')
+        self.lost = token is not None and token != self._get_meta('token')
+        if token is None or self.lost:
+            self._reset()
+
+    @staticmethod
+    def reset(data, _=None):
+        """ Forget the database, which is cleared when it is next used """
+        data.pop('sqlite_token', None)
+        data.pop('journal', None)
+
+    def _reset(self):
+        self.data['sqlite_token'] = uuid.uuid4().hex
+        del self.journal[:]
+        self._execute('DELETE FROM objects')
+        self._execute('INSERT OR REPLACE INTO meta VALUES (?, ?)',
+                      ('token', self.data['sqlite_token']))
+        self.commit()
+
+    @property
+    def is_worker(self):
+        """ Whether this is a parallel worker forked from the process that
+            opened the store """
+        return os.getpid() != self._owner
+
+    def _connect(self):
+        pid = os.getpid()
+        connection = self._connections.get(pid)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=60)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(SCHEMA)
+            self._connections[pid] = connection
+        return connection
+
+    def _execute(self, sql, args=()):
+        return self._connect().execute(sql, args)
+
+    def _get_meta(self, name):
+        row = self._execute('SELECT value FROM meta WHERE name = ?',
+                            (name,)).fetchone()
+        return None if row is None else row[0]
+
+    def get_docname(self, key):
+        location = self.get_location(key)
+        return None if location is None else location[0]
+
+    def get_location(self, key):
+        if key in self._added:
+            return self._added[key]
+        row = self._execute(
+            'SELECT docname, hidden FROM objects '
+            'WHERE fullname = ? AND objtype = ? AND sigid = ?',
+            (key[1], key[0], key[2])).fetchone()
+        return None if row is None else (row[0], bool(row[1]))
+
+    def get_overloads(self, objtype, fullname):
+        return dict(self._execute(
+            'SELECT sigid, docname FROM objects '
+            'WHERE fullname = ? AND objtype = ?', (fullname, objtype)))
+
+    def get_doc_keys(self, docname):
+        return [(objtype, fullname, sigid) for fullname, objtype, sigid
+                in self._execute('SELECT fullname, objtype, sigid '
+                                 'FROM objects WHERE docname = ?',
+                                 (docname,))]
+
+    def add(self, key, docname, hidden=False):
+        if self.is_worker:
+            self._added[key] = (docname, hidden)
+            self.journal.append((key, docname, hidden))
+            return
+        self._execute('INSERT OR REPLACE INTO objects VALUES (?, ?, ?, ?, ?)',
+                      (key[1], key[0], key[2], docname, int(hidden)))
+
+    def remove(self, key):
+        location = self.get_location(key)
+        if self.is_worker:
+            self._added[key] = None
+            return location
+        self._execute('DELETE FROM objects '
+                      'WHERE fullname = ? AND objtype = ? AND sigid = ?',
+                      (key[1], key[0], key[2]))
+        return location
+
+    def find_names(self, target, scope):
+        """ Look up target as a fully qualified name, then in each scope
+            enclosing scope from the innermost outwards. Generates the
+            depth of the scope and the object types, for each scope in
+            which the name exists. """
+        parts = [] if scope is None else scope.split('.')
+        fullnames = [(depth, '.'.join(parts[:depth] + [target]))
+                     for depth in scope_depths(scope)]
+        # Look up the name in all the scopes at once
+        found = {}
+        for fullname, objtype in self._execute(
+                'SELECT fullname, objtype FROM objects WHERE fullname IN '
+                '(%s)' % ', '.join('?' * len(fullnames)),
+                [fullname for _, fullname in fullnames]):
+            found.setdefault(fullname, set()).add(objtype)
+        for depth, fullname in fullnames:
+            if fullname in found:
+                yield depth, found[fullname]
+
+    def get_objtypes(self, fullname):
+        return set(row[0] for row in self._execute(
+            'SELECT objtype FROM objects WHERE fullname = ?', (fullname,)))
+
+    def iter_names(self):
+        """ Generate the (objtype, fullname, overloads, hidden sigids) of
+            each name """
+        return group_names(self._connect().cursor().execute(
+            'SELECT fullname, objtype, sigid, docname, hidden FROM objects '
+            'ORDER BY fullname, objtype'))
+
+    def get_children(self, parent):
+        """ Get the (objtype, fullname, overloads, hidden sigids) of each
+            name directly within parent """
+        # The names within parent are the range of the primary key from
+        # parent + '.' up to parent + '/', the next character
+        prefix = parent + '.'
+        return [name for name in group_names(self._execute(
+            'SELECT fullname, objtype, sigid, docname, hidden FROM objects '
+            'WHERE fullname > ? AND fullname < ? ORDER BY fullname, objtype',
+            (prefix, parent + '/'))) if '.' not in name[1][len(prefix):]]
+
+    @staticmethod
+    def merged_objects(otherdata):
+        """ Generate the (key, docname, hidden) of the objects in the data
+            of a parallel worker """
+        return iter(otherdata['journal'])
+
+    def commit(self):
+        if not self.is_worker:
+            self._connect().commit()
+
+    def check(self, thorough=False):
+        """ Check the database, returning a list of problems found. Checking
+            the integrity of the database reads all of it, so is only done
+            if thorough. """
+        problems = []
+        if self.journal:
+            problems.append('journal of a parallel worker was not merged')
+        if thorough:
+            result = self._execute('PRAGMA quick_check').fetchone()[0]
+            if result != 'ok':
+                problems.append('database %s is corrupt: %s' %
+                                (self.path, result))
+        return problems
+
+
+#: The stores that can be chosen with the csharp_object_store config value
+STORES = {
+    'memory': TrieStore,
+    'sqlite': SqliteStore,
+}
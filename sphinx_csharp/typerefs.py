@@ -0,0 +1,162 @@
+""" Types in the signatures of C# objects, with references to the named
+types in them """
+
+from docutils import nodes
+from sphinx import addnodes
+try:
+    from sphinx.errors import NoUri
+except ImportError:
+    from sphinx.environment import NoUri
+from sphinx.transforms import SphinxTransform
+from sphinx_csharp.references import make_xref_node, resolve_outcome
+from sphinx_csharp.signatures import get_type_names, shorten_type
+from sphinx_csharp.stats import PROFILER
+
+
+def make_type_xref(name, arity, scope):
+    """ Create a pending reference to a named type in a signature """
+    tnode = addnodes.pending_xref(
+        '', refdomain='csharp', reftype='type',
+        reftarget=name, modname=None, classname=None)
+    tnode['csharp:parent'] = scope
+    tnode['csharp:arity'] = arity
+    tnode += nodes.Text(shorten_type(name))
+    return tnode
+
+
+def expand_type(typ, scope, refs=None):
+    """ Create the nodes of a type in a signature, with a pending reference
+        to each named type, or the next of the given resolved references """
+    result = []
+    if typ.tuple_elements:
+        result.append(nodes.Text('('))
+        for i, elem in enumerate(typ.tuple_elements):
+            result.extend(expand_type(elem.typ, scope, refs))
+            if elem.name is not None:
+                result.append(nodes.Text(' ' + elem.name))
+            if i != len(typ.tuple_elements)-1:
+                result.append(nodes.Text(', '))
+        result.append(nodes.Text(')'))
+    elif refs is not None:
+        result.append(next(refs))
+    else:
+        result.append(make_type_xref(typ.name, len(typ.generic_args), scope))
+    if typ.generic_args:
+        result.append(nodes.Text('<'))
+        for i, typ_param in enumerate(typ.generic_args):
+            result.extend(expand_type(typ_param, scope, refs))
+            if i != len(typ.generic_args)-1:
+                result.append(nodes.Text(', '))
+        result.append(nodes.Text('>'))
+    if typ.suffixes:
+        result.append(nodes.Text(''.join(typ.suffixes)))
+    return result
+
+
+# Named like the description nodes in sphinx.addnodes
+# pylint: disable=invalid-name
+class desc_csharp_type(nodes.Inline, nodes.TextElement):
+    """ A type in a signature. The parsed type is stored in the doctree in
+        place of the nodes referring to each named type in it. When the
+        doctree is resolved, ExpandTypes either expands it into those
+        nodes, or stores the resolved references for the translator. """
+# pylint: enable=invalid-name
+
+
+#: The translators that visit desc_csharp_type nodes, which are given the
+#: resolved references of the named types instead of expanded types
+TYPE_TRANSLATORS = ('html', 'latex', 'man', 'texinfo', 'text')
+
+
+def get_type_refs(node):
+    """ The resolved reference to each named type in a type node, taking
+        the nodes that the pending references were resolved into from its
+        children """
+    slots = iter(node['csharp:slots'])
+    return [node[next(slots)] if ref is None else ref
+            for ref in node['csharp:refs']]
+
+
+def visit_desc_csharp_type(_, node):
+    """ Replace the text of a resolved type with its nodes, just before they
+        are visited """
+    if 'csharp:refs' in node:
+        refs = get_type_refs(node)
+        node.children = []
+        node.extend(expand_type(node['csharp:type'], node['csharp:parent'],
+                                iter(refs)))
+
+
+def depart_desc_csharp_type(*_):
+    pass
+
+
+class ExpandTypes(SphinxTransform):
+    """ Resolve the named types in each type in a signature. For the
+        translators in TYPE_TRANSLATORS, the references found are stored in
+        the type node and expanded when it is visited, so the other post
+        transforms don't visit them, and the type is left as its text with
+        a pending reference to each named type that is not found.
+        Otherwise, the type is expanded into pending references, resolved
+        with the others. """
+    default_priority = 5
+
+    def apply(self, **kwargs):
+        builder = self.app.builder
+        lazy = builder.name in TYPE_TRANSLATORS or \
+            builder.format in TYPE_TRANSLATORS
+        domain = self.env.get_domain('csharp')
+        findall = getattr(self.document, 'findall', self.document.traverse)
+        for node in list(findall(desc_csharp_type)):
+            if lazy:
+                self.compact_type(node, self.resolve_type(domain, node))
+            else:
+                node.replace_self(expand_type(node['csharp:type'],
+                                              node['csharp:parent']))
+
+    @staticmethod
+    def compact_type(node, refs):
+        """ Store the references to the named types in a type node, and
+            replace its children with its text and the pending references.
+            Translators may use the text of a signature without visiting
+            it, so it has the text of the references. """
+        children = []
+        text = []
+        for child in expand_type(node['csharp:type'], node['csharp:parent'],
+                                 iter(refs)):
+            if isinstance(child, addnodes.pending_xref):
+                children.extend([nodes.Text(''.join(text)), child])
+                text = []
+            else:
+                text.append(child.astext())
+        children.append(nodes.Text(''.join(text)))
+        node['csharp:refs'] = [
+            None if isinstance(ref, addnodes.pending_xref) else ref
+            for ref in refs]
+        node['csharp:slots'] = list(range(1, len(children), 2))
+        node.children = []
+        node.extend(children)
+
+    def resolve_type(self, domain, node):
+        """ The reference to each named type in a type node, which is a
+            pending reference if it is not found """
+        refs = []
+        scope = node['csharp:parent']
+        for name, arity in get_type_names(node['csharp:type']):
+            with PROFILER.timer('resolve') as timer:
+                found = domain.get_xref_target('type', name, scope, arity)
+                try:
+                    if found is not None:
+                        timer.name = resolve_outcome(found)
+                        refs.append(make_xref_node(
+                            found, self.env.docname, self.app.builder,
+                            nodes.Text(shorten_type(name))))
+                        continue
+                except NoUri:
+                    # Left for Sphinx, which falls back to the content of
+                    # the reference
+                    pass
+                # Recorded when Sphinx resolves the pending reference
+                timer.calls = 0
+            refs.append(make_type_xref(name, arity, scope))
+        return refs
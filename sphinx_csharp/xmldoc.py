@@ -0,0 +1,389 @@
+""" Read C# compiler XML documentation files
+
+The files produced by csc -doc hold a <member> element for each documented
+member, named by its documentation ID, e.g. M:Ns.Class.Method(System.Int32).
+The file is read with an incremental parser and each element is discarded
+as soon as it has been converted, so memory use does not grow with the size
+of the file. Members are converted to reStructuredText for the directives
+of the C# domain, one group of lines per type and the members following it.
+
+Documentation IDs do not include return or property types, so these are
+left out of the signatures. Fields are documented as enum values, and a type
+whose members are all fields is documented as an enum, as the domain has no
+directive for fields. Events and namespaces are skipped.
+"""
+
+import re
+import textwrap
+from collections import namedtuple
+from sphinx.util import logging
+from sphinx_csharp import parser
+
+try:
+    from xml.etree import cElementTree as ElementTree
+except ImportError:
+    from xml.etree import ElementTree
+
+logger = logging.getLogger(__name__)
+
+ParseError = ElementTree.ParseError
+
+Member = namedtuple('Member', ['docid', 'kind', 'parent', 'name',
+                               'directive', 'sig', 'lines'])
+
+ARITY_RE = re.compile(r'`+(\d+)$')
+TYPE_TOKEN_RE = re.compile(r'``(\d+)|`(\d+)|\[[\d:,]*\]|[{},]|[^`{},\[]+')
+SPACE_RE = re.compile(r'\s+')
+ESCAPE_RE = re.compile(r'([\\`*_|])')
+#: Escaped spaces around markup that are not needed
+GUARD_RE = re.compile(r'(?<=\s)\\ |(?<!\\)\\ (?=\s)|^\\ |(?<!\\)\\ $')
+ROLES = {'T': 'type', 'M': 'meth', 'P': 'prop', 'F': 'enum'}
+SECTIONS = ('summary', 'remarks', 'example')
+FIELDS = {'param': 'param', 'typeparam': 'typeparam',
+          'exception': 'raises', 'returns': 'returns', 'value': 'value'}
+
+
+def split_name(name):
+    """ Split the arity from a name in a documentation ID,
+        e.g. List`1 -> (List, 1) """
+    match = ARITY_RE.search(name)
+    if match is None:
+        return name, 0
+    return name[:match.start()], int(match.group(1))
+
+
+def split_docid(docid):
+    """ Split a documentation ID into its kind, the names of the declaring
+        types (without arity), the member name with its arity and the
+        parameter types (None if there are no parentheses) """
+    kind, _, rest = docid.partition(':')
+    rest = rest.partition('~')[0]
+    params = None
+    paren = rest.find('(')
+    if paren >= 0:
+        params = split_params(rest[paren+1:].rstrip(')'))
+        rest = rest[:paren]
+    parts = rest.split('.')
+    parent = [split_name(part)[0] for part in parts[:-1]]
+    return kind, parent, split_name(parts[-1]), params
+
+
+def split_params(params):
+    """ Split a list of parameter types at top level commas """
+    result = []
+    depth = 0
+    start = 0
+    for i, char in enumerate(params):
+        if char in '{[':
+            depth += 1
+        elif char in '}]':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            result.append(params[start:i])
+            start = i + 1
+    if params:
+        result.append(params[start:])
+    return result
+
+
+def default_type_params(arity):
+    if arity == 1:
+        return ('T',)
+    return tuple('T%d' % (i+1) for i in range(arity))
+
+
+def convert_type(text, type_params, method_params, aliases):
+    """ Convert a type in a documentation ID to C# syntax, e.g.
+        System.Collections.Generic.List{System.Int32}[] -> List<int>[] """
+    result = []
+    for match in TYPE_TOKEN_RE.finditer(text):
+        token = match.group()
+        if match.group(1) is not None:
+            index = int(match.group(1))
+            token = method_params[index] if index < len(method_params) \
+                else 'T%d' % index
+        elif match.group(2) is not None:
+            index = int(match.group(2))
+            token = type_params[index] if index < len(type_params) \
+                else 'T%d' % index
+        elif token[0] == '[':
+            token = '[' + ',' * token.count(',') + ']'
+        elif token == '{':
+            token = '<'
+        elif token == '}':
+            token = '>'
+        elif token == ',':
+            token = ', '
+        else:
+            token = aliases.get(token, token)
+        result.append(token)
+    return ''.join(result)
+
+
+def escape_text(text):
+    """ Escape text for use in reStructuredText, collapsing whitespace """
+    if not text:
+        return ''
+    return ESCAPE_RE.sub(r'\\\1', SPACE_RE.sub(' ', text))
+
+
+def cref_markup(cref, title=None):
+    """ Create a cross-reference to a member given by its ID """
+    kind, parent, (name, _), _ = split_docid(cref)
+    if name == '#ctor':
+        kind = 'T'
+        name = parent.pop()
+    name = name.replace('#', '.')
+    target = '.'.join(parent + [name])
+    if title is None:
+        title = name
+    if kind not in ROLES:
+        return '``%s``' % target
+    return ':%s:`%s <%s>`' % (ROLES[kind], escape_text(title), target)
+
+
+def see_markup(elem):
+    """ Convert a <see> or <seealso> element to reStructuredText """
+    title = inline_text(elem) or None
+    if elem.get('cref'):
+        return cref_markup(elem.get('cref'), title)
+    if elem.get('langword'):
+        return '``%s``' % elem.get('langword')
+    if elem.get('href'):
+        return '`%s <%s>`_' % (title or elem.get('href'), elem.get('href'))
+    return title or ''
+
+
+def inline_markup(elem):
+    """ Convert an inline element to reStructuredText """
+    if elem.tag in ('see', 'seealso'):
+        return see_markup(elem)
+    if elem.tag in ('paramref', 'typeparamref'):
+        return '``%s``' % elem.get('name', '')
+    if elem.tag == 'c':
+        return '``%s``' % ' '.join(''.join(elem.itertext()).split())
+    return inline_text(elem)
+
+
+def guard_markup(markup):
+    """ Allow inline markup directly next to other text, by surrounding it
+        with escaped spaces """
+    if markup[:1] in (':', '`'):
+        return '\\ ' + markup + '\\ '
+    return markup
+
+
+def inline_text(elem):
+    """ Convert the contents of an element to a line of reStructuredText """
+    parts = [escape_text(elem.text)]
+    for child in elem:
+        parts.append(guard_markup(inline_markup(child)))
+        parts.append(escape_text(child.tail))
+    return join_text(parts)
+
+
+def join_text(parts):
+    """ Join text and markup, collapsing whitespace and removing the escaped
+        spaces around markup that is next to whitespace anyway """
+    text = GUARD_RE.sub('', ''.join(parts))
+    return ' '.join(text.split())
+
+
+def append_paragraph(lines, parts):
+    text = join_text(parts)
+    if text:
+        lines.extend([text, ''])
+    del parts[:]
+
+
+def block_lines(elem):
+    """ Convert the contents of a block element to lines of
+        reStructuredText, separating paragraphs with blank lines """
+    lines = []
+    parts = [escape_text(elem.text)]
+    for child in elem:
+        if child.tag in ('para', 'code', 'list'):
+            append_paragraph(lines, parts)
+            if child.tag == 'para':
+                lines.extend(block_lines(child))
+            elif child.tag == 'code':
+                code = textwrap.dedent(
+                    ''.join(child.itertext())).strip().splitlines()
+                lines.extend(['::', ''] + ['   ' + line for line in code])
+                lines.append('')
+            else:
+                for item in child.iter('item'):
+                    desc = item.find('description')
+                    text = inline_text(item if desc is None else desc)
+                    lines.extend(['* ' + text, ''])
+        else:
+            parts.append(guard_markup(inline_markup(child)))
+        parts.append(escape_text(child.tail))
+    append_paragraph(lines, parts)
+    return lines
+
+
+def doc_lines(elem):
+    """ Convert the documentation of a member to lines of
+        reStructuredText, with a field list for parameters etc. """
+    lines = []
+    fields = []
+    for child in elem:
+        if child.tag in SECTIONS:
+            lines.extend(block_lines(child))
+        elif child.tag in FIELDS:
+            arg = child.get('name')
+            if child.tag == 'exception':
+                arg = child.get('cref', '').partition(':')[2] or None
+            field = FIELDS[child.tag]
+            if arg:
+                field += ' ' + arg
+            fields.append(':%s: %s' % (field, inline_text(child)))
+    if fields:
+        lines.extend(fields + [''])
+    return lines
+
+
+def make_params(elem, params, type_params, aliases):
+    """ Create the parameter list of a member signature, taking the names of
+        the parameters from the <param> elements """
+    names = [param.get('name') for param in elem.iter('param')]
+    result = []
+    for i, typ in enumerate(params):
+        modifier = ''
+        if typ.endswith('@'):
+            typ = typ[:-1]
+            modifier = 'ref '
+        typ = convert_type(typ, type_params[0], type_params[1], aliases)
+        name = names[i] if i < len(names) else 'arg%d' % i
+        result.append('%s%s %s' % (modifier, typ, name))
+    return ', '.join(result)
+
+
+def make_member(elem, type_params, aliases):
+    """ Create a Member for a <member> element. Returns None for members
+        that cannot be documented by the domain. type_params maps the names
+        of the generic types read so far to their generic parameters. """
+    docid = elem.get('name', '')
+    kind, parent, (name, arity), params = split_docid(docid)
+    if kind not in ('T', 'M', 'P', 'F'):
+        return None
+    own_params = tuple(param.get('name') for param in elem.iter('typeparam'))
+    if arity and len(own_params) != arity:
+        own_params = default_type_params(arity)
+    generic = '<' + ', '.join(own_params) + '>' if arity else ''
+    if kind == 'T':
+        if arity:
+            type_params['.'.join(parent + [name])] = own_params
+        return Member(docid, kind, '.'.join(parent), name, 'class',
+                      name + generic, doc_lines(elem))
+
+    # Generic parameters of the declaring types, outermost first
+    outer_params = sum((type_params.get('.'.join(parent[:i+1]), ())
+                        for i in range(len(parent))), ())
+    params = make_params(elem, params or (), (outer_params, own_params),
+                         aliases)
+    if kind == 'M':
+        directive = 'method'
+        sig = name.replace('#', '.') + generic
+        if name == '#ctor':
+            sig = parent[-1]
+        elif name == '#cctor':
+            sig = 'static ' + parent[-1]
+        sig += '(' + params + ')'
+    elif kind == 'P' and params:
+        directive = 'indexer'
+        sig = 'this[' + params + '] { }'
+    elif kind == 'P':
+        directive = 'property'
+        sig = name.replace('#', '.') + ' { }'
+    else:
+        directive = 'value'
+        sig = name
+    return Member(docid, kind, '.'.join(parent), name, directive, sig,
+                  doc_lines(elem))
+
+
+PARSERS = {
+    'class': parser.parse_type,
+    'method': parser.parse_method,
+    'property': parser.parse_property,
+    'indexer': parser.parse_indexer,
+    'value': parser.parse_type,
+}
+
+
+def read_members(path, aliases=None):
+    """ Read the members from an XML documentation file, in the order they
+        appear. aliases maps full type names to the names to use in
+        signatures, e.g. System.Int32 -> int. """
+    aliases = aliases or {}
+    type_params = {}
+    container = None
+    for event, elem in ElementTree.iterparse(path, events=('start', 'end')):
+        if event == 'start':
+            if container is None or elem.tag == 'members':
+                container = elem
+        elif elem.tag == 'member':
+            member = make_member(elem, type_params, aliases)
+            # Discard the element, and any before it
+            container.clear()
+            if member is None:
+                continue
+            try:
+                PARSERS[member.directive](member.sig)
+            except parser.SignatureError as exn:
+                logger.warning('Skipping %s in %s: %s',
+                               member.docid, path, exn)
+                continue
+            yield member
+
+
+def group_lines(group):
+    """ Convert a type and its members, or members without their type, to
+        reStructuredText """
+    head = group[0]
+    members = group
+    lines = ['.. namespace:: ' + (head.parent or 'None'), '']
+    indent = ''
+    if head.kind == 'T':
+        objtype = 'class'
+        if len(group) > 1 and all(m.kind == 'F' for m in group[1:]):
+            objtype = 'enum'
+            head = head._replace(sig=head.name)
+        lines.extend(['.. %s:: %s' % (objtype, head.sig), ''])
+        lines.extend('   ' + line if line else '' for line in head.lines)
+        members = group[1:]
+        indent = '   '
+    for member in members:
+        lines.extend([indent + '.. %s:: %s' % (member.directive, member.sig),
+                      ''])
+        lines.extend(indent + '   ' + line if line else ''
+                     for line in member.lines)
+    return lines
+
+
+def get_fullname(member):
+    if member.parent:
+        return member.parent + '.' + member.name
+    return member.name
+
+
+def iter_rst(path, namespace=None, aliases=None):
+    """ Generate reStructuredText for the members of an XML documentation
+        file, optionally only those in the given namespace. Yields a list
+        of lines for each type with the members that follow it. """
+    group = []
+    for member in read_members(path, aliases):
+        if namespace and \
+           not get_fullname(member).startswith(namespace + '.'):
+            continue
+        if group:
+            head = group[0]
+            scope = get_fullname(head) if head.kind == 'T' else head.parent
+            if member.kind == 'T' or member.parent != scope:
+                yield group_lines(group)
+                group = []
+        group.append(member)
+    if group:
+        yield group_lines(group)
@@ -5,12 +5,24 @@ copyright = '2015-2016, djungelorm'
 
 master_doc = 'index'
 source_suffix = '.rst'
-extensions = ['sphinx_csharp.csharp']
+extensions = ['sphinx_csharp.csharp', 'sphinx.ext.intersphinx']
+
+# C# objects documented by another project, read from a local inventory
+intersphinx_mapping = {
+    'other': ('https://example.com/other/', 'other.inv'),
+}
 
 pygments_style = 'sphinx'
 
 nitpick_ignore = [
     ('csharp:type', 'void'),
     ('csharp:type', 'T'),
+    ('csharp:type', 'TItem'),
+    ('csharp:type', 'TResult'),
     ('csharp:type', 'List')
 ]
+
+# Export the documented objects, to check the export is the same in serial,
+# parallel and incremental builds
+csharp_symbol_export = 'symbols.jsonl'
+